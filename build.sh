@@ -5,6 +5,21 @@ set -o errexit
 # Modify this line as needed for your project
 pip install -r requirements.txt
 
+# ffmpeg and ffprobe power video probing and the audio, scene and fingerprint
+# analyses (without them those stages are skipped). Render's native Python
+# runtime has no apt, so fetch static builds into bin/, which settings.py puts
+# on PATH. A failed download only degrades analysis, so it does not fail the build.
+if ! command -v ffmpeg >/dev/null || ! command -v ffprobe >/dev/null; then
+  mkdir -p bin
+  FFMPEG_URL="${FFMPEG_URL:-https://johnvansickle.com/ffmpeg/releases/ffmpeg-release-amd64-static.tar.xz}"
+  if curl -fsSL "$FFMPEG_URL" -o /tmp/ffmpeg-static.tar.xz; then
+    tar -xJf /tmp/ffmpeg-static.tar.xz -C bin --strip-components=1 --wildcards '*/ffmpeg' '*/ffprobe'
+    rm -f /tmp/ffmpeg-static.tar.xz
+  else
+    echo "WARNING: could not download ffmpeg; media analysis will be skipped" >&2
+  fi
+fi
+
 # Convert static asset files
 python manage.py collectstatic --no-input
 
@@ -0,0 +1,26 @@
+"""
+Gunicorn configuration tuned for cold starts on Render's free plan.
+
+The app is preloaded and its URLconf and templates warmed in the master,
+so they are shared copy-on-write by every worker. The Gemini SDK import and
+client creation (~1 s) stay off the critical path: each worker does them on
+a background thread after it has started serving.
+"""
+import os
+
+wsgi_app = 'zuckky_ai.wsgi:application'
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+preload_app = True
+
+
+def when_ready(server):
+    from zuckkyai_app.warmup import warm_up
+    warm_up(prime_client=False)
+
+
+def post_worker_init(worker):
+    from zuckkyai_app.warmup import warm_up_in_background
+    warm_up_in_background()
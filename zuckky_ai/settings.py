@@ -34,6 +34,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'zuckkyai_app.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -115,4 +116,87 @@ GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', 'AIzaSyBhNJW74ql84OgFx4tROOZtP
 # Video Processing Settings
 VIDEO_API_URL = 'https://api.runwayml.com/v1'
 VIDEO_API_KEY = os.environ.get('VIDEO_API_KEY', 'your-actual-api-key-here')
-MOCK_VIDEO_PROCESSING = True
\ No newline at end of file
+MOCK_VIDEO_PROCESSING = True
+
+# ffmpeg/ffprobe for probing and media analysis: build.sh installs static
+# binaries into bin/ when the system has none; workers and analysis
+# subprocesses inherit the PATH
+FFMPEG_BIN_DIR = os.path.join(BASE_DIR, 'bin')
+if os.path.isdir(FFMPEG_BIN_DIR) and FFMPEG_BIN_DIR not in os.environ.get('PATH', '').split(os.pathsep):
+    os.environ['PATH'] = FFMPEG_BIN_DIR + os.pathsep + os.environ.get('PATH', '')
+
+# Reverse proxies in front of the app that append the client address to
+# X-Forwarded-For (Render's load balancer is one); 0 trusts only REMOTE_ADDR
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', '0'))
+
+# Batch renders: one upload fanned out to several styles
+BATCH_MAX_VARIANTS = 8
+BATCH_MAX_PARALLEL = 4
+
+# Local render jobs: worker slots per process and cancellation bounds (seconds)
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', '2'))
+CANCEL_POLL_INTERVAL = 0.5
+CANCEL_GRACE_SECONDS = 2.0
+CANCEL_TIMEOUT = 5.0
+
+# Render queue: priority classes (lower runs first) and the one requests get by
+# default (only staff may ask for a higher one), per-user concurrency cap (a
+# batch counts once, running up to BATCH_MAX_PARALLEL variants), fair-share
+# weights by client id (default 1.0) and the cost assumed when neither a
+# video's duration nor its size could be probed
+RENDER_PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+RENDER_DEFAULT_PRIORITY = 'normal'
+RENDER_MAX_JOBS_PER_USER = int(os.environ.get('RENDER_MAX_JOBS_PER_USER', '1'))
+RENDER_USER_WEIGHTS = {}
+RENDER_DEFAULT_COST_SECONDS = 60.0
+# Bitrate assumed (bytes per second) to turn a file size into a cost when
+# the duration could not be probed
+RENDER_COST_BYTES_PER_SECOND = 1_000_000
+
+# Per-worker render queue forecasts, read to report queue positions
+RENDER_QUEUE_DIR = os.environ.get('RENDER_QUEUE_DIR', os.path.join(BASE_DIR, 'render_queue'))
+
+# Metrics: per-worker snapshots are merged from this directory on /metrics
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(BASE_DIR, 'metrics'))
+METRICS_FLUSH_INTERVAL = 1.0
+
+# Logging: JSON lines written by a background thread; request threads only enqueue
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '1.0'))  # fraction of DEBUG/INFO records kept
+LOG_MAX_FIELD_LENGTH = int(os.environ.get('LOG_MAX_FIELD_LENGTH', '500'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'sample': {
+            '()': 'zuckkyai_app.utils.log.SamplingFilter',
+            'rate': LOG_SAMPLE_RATE,
+        },
+    },
+    'formatters': {
+        'json': {
+            '()': 'zuckkyai_app.utils.log.JsonFormatter',
+        },
+    },
+    'handlers': {
+        'queue': {
+            'class': 'zuckkyai_app.utils.log.NonBlockingQueueHandler',
+            'formatter': 'json',
+            'filters': ['sample'],
+            'queue_size': 10000,
+            'max_length': LOG_MAX_FIELD_LENGTH,
+        },
+    },
+    'root': {
+        'handlers': ['queue'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        'zuckkyai_app': {
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
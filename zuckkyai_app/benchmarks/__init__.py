@@ -0,0 +1,2 @@
+from .runner import BenchmarkRunner, compare_reports
+from .stubs import FakeGenerativeModel, StubVideoAPI
@@ -0,0 +1,394 @@
+"""
+Benchmark runner: serves the Django app from a separate process (see
+server.py), points it at the stand-ins from stubs.py and drives chat,
+upload, process and status-poll workloads against it over real HTTP.
+Each workload gets a fresh server process, whose memory is sampled on
+its own.
+"""
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.conf import settings
+
+from .stubs import FakeGenerativeModel, StubVideoAPI
+
+WORKLOADS = ('chat', 'upload', 'process', 'status')
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+PROCESS_STYLES = ('Alex Hormozi', 'Iman Gadzhi', 'Gary Vee')
+
+SERVER_START_TIMEOUT = 60
+
+SIZE_SUFFIXES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(value):
+    """Parse sizes like '512M' or '2G' into bytes"""
+    value = str(value).strip().upper().rstrip('B')
+    if value and value[-1] in SIZE_SUFFIXES:
+        return int(float(value[:-1]) * SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class MemorySampler:
+    """Polls a process's resident set size in a background thread and keeps the peak (Linux /proc)"""
+
+    def __init__(self, pid, interval=0.02):
+        self.pid = pid
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    def current_rss(self):
+        try:
+            with open(f'/proc/{self.pid}/statm') as f:
+                return int(f.read().split()[1]) * self._page_size
+        except (OSError, ValueError, IndexError):
+            return 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self.current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_bytes = self.current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self.current_rss())
+
+
+class _MultipartBody:
+    """
+    Streams a multipart/form-data body with a synthetic zero-filled file,
+    so multi-GB uploads never have to exist in memory or on disk.
+    """
+
+    def __init__(self, fields, file_field, file_name, file_size):
+        self.boundary = f"----zuckkybench{uuid.uuid4().hex}"
+        head = []
+        for name, value in fields.items():
+            head.append(
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f"{value}\r\n"
+            )
+        head.append(
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{file_field}"; filename="{file_name}"\r\n'
+            "Content-Type: video/mp4\r\n\r\n"
+        )
+        self.head = ''.join(head).encode()
+        self.tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self.file_size = file_size
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return len(self.head) + self.file_size + len(self.tail)
+
+    def __iter__(self):
+        yield self.head
+        chunk = bytes(UPLOAD_CHUNK_SIZE)
+        remaining = self.file_size
+        while remaining > 0:
+            size = min(remaining, UPLOAD_CHUNK_SIZE)
+            yield chunk if size == UPLOAD_CHUNK_SIZE else chunk[:size]
+            remaining -= size
+        yield self.tail
+
+
+@contextmanager
+def fake_gemini(latency, error_rate):
+    """Make GeminiClient build FakeGenerativeModel instances"""
+    import google.generativeai as genai
+    from ..utils import gemini_client
+
+    original = genai.GenerativeModel
+    genai.GenerativeModel = lambda model_name, **kwargs: FakeGenerativeModel(
+        model_name, latency=latency, error_rate=error_rate
+    )
+    # Drop any cached client so the next chat builds one with the fake model
+    gemini_client._client = None
+    try:
+        yield
+    finally:
+        genai.GenerativeModel = original
+        gemini_client._client = None
+
+
+class BenchmarkRunner:
+    """Runs the selected workloads and returns a JSON-serializable report"""
+
+    def __init__(self, requests=50, concurrency=8, uploads=2, upload_size=64 * 1024 ** 2,
+                 gemini_latency=0.2, gemini_error_rate=0.0,
+                 video_api_latency=0.05, video_api_error_rate=0.0, log=print):
+        self.requests = requests
+        self.concurrency = concurrency
+        self.uploads = uploads
+        self.upload_size = upload_size
+        self.gemini_latency = gemini_latency
+        self.gemini_error_rate = gemini_error_rate
+        self.video_api_latency = video_api_latency
+        self.video_api_error_rate = video_api_error_rate
+        self.log = log
+        self.host = '127.0.0.1'
+        self.port = None
+        self.source_video = None
+
+    def _request(self, method, path, body=None, headers=None):
+        """Issue one request; returns (ok, latency_seconds, bytes_sent)"""
+        ok, latency, sent, _ = self._exchange(method, path, body, headers)
+        return ok, latency, sent
+
+    def _exchange(self, method, path, body=None, headers=None):
+        """Issue one request; returns (ok, latency_seconds, bytes_sent, parsed JSON or None)"""
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=600)
+        started = time.perf_counter()
+        data = None
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            payload = response.read()
+            ok = response.status == 200
+            if ok:
+                try:
+                    data = json.loads(payload)
+                    ok = data.get('success', True) is not False
+                except ValueError:
+                    ok = False
+        except (OSError, http.client.HTTPException):
+            ok = False
+        finally:
+            conn.close()
+        sent = len(body) if body is not None else 0
+        return ok, time.perf_counter() - started, sent, data
+
+    def _chat(self, i):
+        body = json.dumps({'message': f'How do I make video #{i} go viral?', 'history': []}).encode()
+        return self._request('POST', '/api/chat/', body, {'Content-Type': 'application/json'})
+
+    def _upload(self, i):
+        body = _MultipartBody({'type': 'main'}, 'video', f'bench_{i}.mp4', self.upload_size)
+        headers = {'Content-Type': body.content_type, 'Content-Length': str(len(body))}
+        return self._request('POST', '/api/upload/', body, headers)
+
+    def _upload_source(self):
+        """Upload a small main video for the process and status workloads (not timed)"""
+        body = _MultipartBody({'type': 'main'}, 'video', 'bench_source.mp4', 256 * 1024)
+        headers = {'Content-Type': body.content_type, 'Content-Length': str(len(body))}
+        ok, _, _, data = self._exchange('POST', '/api/upload/', body, headers)
+        if not ok:
+            raise RuntimeError(f'Could not upload the benchmark source video: {data}')
+        self.source_video = data['file_path']
+
+    def _process(self, i):
+        """Start a one-variant batch, which probes the input and submits it to the video API"""
+        body = json.dumps({'main_video': self.source_video, 'styles': [PROCESS_STYLES[i % len(PROCESS_STYLES)]]})
+        return self._request('POST', '/api/process-batch/', body.encode(), {'Content-Type': 'application/json'})
+
+    def _status(self, task_id):
+        return self._request('GET', f'/api/status/{task_id}/')
+
+    def _seed_tasks(self, count):
+        """Start tasks through the API so /status has something to poll (not timed)"""
+        self._upload_source()
+        task_ids = []
+        for i in range(count):
+            body = json.dumps({'main_video': self.source_video, 'styles': [PROCESS_STYLES[i % len(PROCESS_STYLES)]]})
+            ok, _, _, data = self._exchange('POST', '/api/process-batch/', body.encode(),
+                                            {'Content-Type': 'application/json'})
+            if not ok:
+                raise RuntimeError(f'Could not seed a task: {data}')
+            _, _, _, status = self._exchange('GET', f"/api/batch-status/{data['group_id']}/")
+            task_ids.append(status['status']['variants'][0]['task_id'])
+        return task_ids
+
+    def _prepare_process(self, args):
+        self._upload_source()
+        return args
+
+    def _prepare_status(self, count):
+        task_ids = self._seed_tasks(count)
+        return [task_ids[i % len(task_ids)] for i in range(self.requests)]
+
+    @contextmanager
+    def _server(self, overrides, log_path):
+        """Run the app in its own process on a free port"""
+        with socket.socket() as sock:
+            sock.bind((self.host, 0))
+            self.port = sock.getsockname()[1]
+        config = {
+            'host': self.host,
+            'port': self.port,
+            'settings': dict(overrides, BASE_URL=f'http://{self.host}:{self.port}'),
+            'gemini_latency': self.gemini_latency,
+            'gemini_error_rate': self.gemini_error_rate,
+        }
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'zuckky_ai.settings'))
+        with open(log_path, 'ab') as log:
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'zuckkyai_app.benchmarks.server', json.dumps(config)],
+                cwd=settings.BASE_DIR, env=env, stdout=log, stderr=log,
+            )
+        try:
+            deadline = time.monotonic() + SERVER_START_TIMEOUT
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f'Benchmark server exited with status {process.returncode}, see {log_path}')
+                try:
+                    socket.create_connection((self.host, self.port), timeout=1).close()
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise RuntimeError(f'Benchmark server did not start, see {log_path}')
+                    time.sleep(0.05)
+            yield process
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    def _run_workload(self, name, func, args, overrides, log_path, prepare=None):
+        with self._server(overrides, log_path) as server:
+            if prepare:
+                args = prepare(args)
+            memory = MemorySampler(server.pid)
+            idle_rss = memory.current_rss()
+            with memory:
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                    results = list(pool.map(func, args))
+                wall = time.perf_counter() - started
+
+        latencies = sorted(latency for _, latency, _ in results)
+        errors = sum(1 for ok, _, _ in results if not ok)
+        sent = sum(size for _, _, size in results)
+        report = {
+            'requests': len(results),
+            'errors': errors,
+            'error_rate': errors / len(results) if results else 0.0,
+            'throughput_rps': len(results) / wall if wall else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'idle_rss_mb': idle_rss / 1024 ** 2,
+            'peak_rss_mb': memory.peak_bytes / 1024 ** 2,
+        }
+        if sent:
+            report['upload_mb_per_s'] = sent / 1024 ** 2 / wall if wall else 0.0
+        self.log(f"{name}: {report['requests']} requests, {report['errors']} errors, "
+                 f"p95 {report['p95_ms']:.1f} ms, server peak RSS {report['peak_rss_mb']:.0f} MB")
+        return report
+
+    def run(self, workloads=WORKLOADS):
+        video_api = StubVideoAPI(latency=self.video_api_latency, error_rate=self.video_api_error_rate).start()
+        media_root = tempfile.mkdtemp(prefix='zuckky_bench_')
+        log_path = os.path.join(tempfile.gettempdir(), f'zuckky_bench_server_{os.getpid()}.log')
+
+        report = {
+            'config': {
+                'requests': self.requests,
+                'concurrency': self.concurrency,
+                'uploads': self.uploads,
+                'upload_size': self.upload_size,
+                'gemini_latency': self.gemini_latency,
+                'gemini_error_rate': self.gemini_error_rate,
+                'video_api_latency': self.video_api_latency,
+                'video_api_error_rate': self.video_api_error_rate,
+            },
+            'endpoints': {},
+        }
+        overrides = {
+            'MEDIA_ROOT': media_root,
+            'METRICS_DIR': os.path.join(media_root, 'metrics'),
+            'RENDER_QUEUE_DIR': os.path.join(media_root, 'render_queue'),
+            'VIDEO_API_URL': video_api.url,
+            'MOCK_VIDEO_PROCESSING': False,
+            'ALLOWED_HOSTS': [self.host],
+        }
+        try:
+            for name in workloads:
+                if name == 'chat':
+                    result = self._run_workload(name, self._chat, range(self.requests), overrides, log_path)
+                elif name == 'upload':
+                    result = self._run_workload(name, self._upload, range(self.uploads), overrides, log_path)
+                elif name == 'process':
+                    result = self._run_workload(name, self._process, range(self.requests), overrides, log_path,
+                                                prepare=self._prepare_process)
+                elif name == 'status':
+                    result = self._run_workload(name, self._status, min(self.requests, 20), overrides, log_path,
+                                                prepare=self._prepare_status)
+                else:
+                    raise ValueError(f'Unknown workload: {name}')
+                report['endpoints'][name] = result
+        finally:
+            video_api.stop()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        return report
+
+
+def compare_reports(baseline, current, tolerance=0.2):
+    """
+    Return human-readable regressions of `current` against `baseline`.
+    Latency and RSS may grow, and throughput shrink, by at most `tolerance`.
+    """
+    regressions = []
+    for name, result in current.get('endpoints', {}).items():
+        base = baseline.get('endpoints', {}).get(name)
+        if not base:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'peak_rss_mb'):
+            if base.get(metric) and result[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{name} {metric}: {base[metric]:.1f} -> {result[metric]:.1f}")
+        if base.get('throughput_rps') and result['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            regressions.append(
+                f"{name} throughput_rps: {base['throughput_rps']:.1f} -> {result['throughput_rps']:.1f}"
+            )
+        if result['error_rate'] > base.get('error_rate', 0) + tolerance:
+            regressions.append(f"{name} error_rate: {base.get('error_rate', 0):.2f} -> {result['error_rate']:.2f}")
+    return regressions
@@ -0,0 +1,36 @@
+"""
+Benchmark server process: serves the Django app on a given port with the
+benchmark's settings overrides and the fake Gemini model. Running it apart
+from the load-generating client lets the runner sample the server's memory
+alone, and a fresh process per workload keeps workloads from inheriting
+each other's peak.
+
+Started by BenchmarkRunner as
+`python -m zuckkyai_app.benchmarks.server '<json config>'`.
+"""
+import json
+import os
+import sys
+
+
+def main(argv):
+    config = json.loads(argv[1])
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'zuckky_ai.settings')
+    import django
+    django.setup()
+
+    from wsgiref.simple_server import make_server
+
+    from django.core.wsgi import get_wsgi_application
+    from django.test.utils import override_settings
+
+    from .runner import _QuietHandler, _ThreadingWSGIServer, fake_gemini
+
+    with override_settings(**config['settings']), fake_gemini(config['gemini_latency'], config['gemini_error_rate']):
+        server = make_server(config['host'], config['port'], get_wsgi_application(),
+                             server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    main(sys.argv)
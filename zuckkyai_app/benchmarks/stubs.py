@@ -0,0 +1,153 @@
+"""
+Local stand-ins for the external services the app talks to.
+
+FakeGenerativeModel replaces the Gemini model and StubVideoAPI serves the
+RunwayML-style /process, /status and /download endpoints, both with
+configurable latency and error rates so benchmarks never leave the machine.
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGenerationError(Exception):
+    pass
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Drop-in for genai.GenerativeModel with a fixed latency and error rate"""
+
+    def __init__(self, model_name='fake-gemini', latency=0.2, error_rate=0.0, response_words=60):
+        self.model_name = model_name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.response_text = ' '.join(['edit'] * response_words)
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            raise FakeGenerationError('Simulated Gemini failure')
+        return FakeResponse(self.response_text)
+
+
+class _VideoAPIHandler(BaseHTTPRequestHandler):
+    """Request handler for StubVideoAPI; state lives on the server object"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status_code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _simulate(self):
+        """Apply latency and return True if this call should fail"""
+        api = self.server.api
+        time.sleep(api.latency)
+        return bool(api.error_rate) and random.random() < api.error_rate
+
+    def do_POST(self):
+        api = self.server.api
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        if self._simulate():
+            return self._send_json(503, {'error': 'Simulated upstream failure'})
+
+        if self.path.rstrip('/').endswith('/process'):
+            task_id = f"stub_{uuid.uuid4().hex[:12]}"
+            api.register_task(task_id)
+            return self._send_json(200, {'task_id': task_id, 'status': 'submitted'})
+
+        if '/cancel/' in self.path:
+            task_id = self.path.rstrip('/').rsplit('/', 1)[-1]
+            return self._send_json(200 if api.cancel_task(task_id) else 404, {'task_id': task_id})
+
+        self._send_json(404, {'error': 'Not found'})
+
+    def do_GET(self):
+        api = self.server.api
+        if self._simulate():
+            return self._send_json(503, {'error': 'Simulated upstream failure'})
+
+        task_id = self.path.rstrip('/').rsplit('/', 1)[-1]
+        if '/status/' in self.path:
+            status = api.task_status(task_id)
+            return self._send_json(200 if status else 404, status or {'error': 'Task not found'})
+
+        if '/download/' in self.path:
+            status = api.task_status(task_id)
+            if not status:
+                return self._send_json(404, {'error': 'Task not found'})
+            return self._send_json(200, {'download_url': f"{api.url}/files/{task_id}.mp4"})
+
+        self._send_json(404, {'error': 'Not found'})
+
+
+class StubVideoAPI:
+    """
+    Threaded HTTP server emulating the video editing API.
+    Tasks complete `task_duration` seconds after submission.
+    """
+
+    def __init__(self, latency=0.05, error_rate=0.0, task_duration=5.0, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.task_duration = task_duration
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _VideoAPIHandler)
+        self._server.daemon_threads = True
+        self._server.api = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def register_task(self, task_id):
+        with self._lock:
+            self._tasks[task_id] = {'started_at': time.time(), 'canceled': False}
+
+    def cancel_task(self, task_id):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task:
+                task['canceled'] = True
+            return task is not None
+
+    def task_status(self, task_id):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if not task:
+                return None
+            if task['canceled']:
+                return {'task_id': task_id, 'status': 'canceled', 'progress': 0}
+            elapsed = time.time() - task['started_at']
+            if elapsed >= self.task_duration:
+                return {'task_id': task_id, 'status': 'completed', 'progress': 100}
+            progress = int(elapsed / self.task_duration * 100) if self.task_duration else 100
+            return {'task_id': task_id, 'status': 'processing', 'progress': progress}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
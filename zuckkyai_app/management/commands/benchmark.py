@@ -0,0 +1,72 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from zuckkyai_app.benchmarks.runner import WORKLOADS, BenchmarkRunner, compare_reports, parse_size
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the app against a local fake Gemini model and a stub video API. "
+        "Reports throughput, p50/p95/p99 latency and the server process's idle and peak RSS "
+        "per endpoint (each workload runs against a fresh server process)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workloads', default=','.join(WORKLOADS),
+                            help=f"Comma-separated workloads to run ({', '.join(WORKLOADS)})")
+        parser.add_argument('--requests', type=int, default=50, help='Requests per chat/process/status workload (process starts one-variant batches)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent client threads')
+        parser.add_argument('--uploads', type=int, default=2, help='Number of uploads in the upload workload')
+        parser.add_argument('--upload-size', default='64M', help="Synthetic upload size, e.g. '512M' or '2G'")
+        parser.add_argument('--gemini-latency', type=float, default=0.2, help='Fake Gemini latency in seconds')
+        parser.add_argument('--gemini-error-rate', type=float, default=0.0, help='Fake Gemini failure ratio (0-1)')
+        parser.add_argument('--video-api-latency', type=float, default=0.05, help='Stub video API latency in seconds')
+        parser.add_argument('--video-api-error-rate', type=float, default=0.0,
+                            help='Stub video API failure ratio (0-1)')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--baseline', help='Compare against a previously saved JSON report')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed relative regression against the baseline (default 0.2)')
+
+    def handle(self, *args, **options):
+        workloads = [name.strip() for name in options['workloads'].split(',') if name.strip()]
+        unknown = set(workloads) - set(WORKLOADS)
+        if unknown:
+            raise CommandError(f"Unknown workloads: {', '.join(sorted(unknown))}")
+
+        runner = BenchmarkRunner(
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            uploads=options['uploads'],
+            upload_size=parse_size(options['upload_size']),
+            gemini_latency=options['gemini_latency'],
+            gemini_error_rate=options['gemini_error_rate'],
+            video_api_latency=options['video_api_latency'],
+            video_api_error_rate=options['video_api_error_rate'],
+            log=self.stdout.write,
+        )
+        report = runner.run(workloads)
+
+        self.stdout.write('')
+        self.stdout.write(f"{'endpoint':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+                          f"{'p99 ms':>10}{'errors':>8}{'idle MB':>10}{'peak MB':>10}")
+        for name, result in report['endpoints'].items():
+            self.stdout.write(
+                f"{name:<10}{result['throughput_rps']:>10.1f}{result['p50_ms']:>10.1f}"
+                f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['errors']:>8}"
+                f"{result['idle_rss_mb']:>10.0f}{result['peak_rss_mb']:>10.0f}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = compare_reports(baseline, report, options['tolerance'])
+            if regressions:
+                raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
@@ -0,0 +1,138 @@
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter: time serving readiness, then the warm-up
+PROBE = """
+import sys, time
+started = time.perf_counter()
+{eager}
+import zuckky_ai.wsgi
+from django.urls import get_resolver
+get_resolver().url_patterns
+ready = time.perf_counter()
+from zuckkyai_app.warmup import warm_up
+warm_up()
+print('STARTUP_REPORT', (ready - started) * 1000, (time.perf_counter() - ready) * 1000, file=sys.stderr)
+"""
+
+# What views.py and video_processor.py used to import at module load
+EAGER_IMPORTS = 'import google.generativeai, requests'
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the cold-start budget: time to first response and to a primed Gemini "
+        "client under gunicorn.conf.py, the import budget with lazy vs eager heavy "
+        "imports, and the slowest imports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters per scenario (median is reported)')
+        parser.add_argument('--top', type=int, default=10, help='Number of slowest imports to list')
+        parser.add_argument('--timeout', type=float, default=60.0, help='Seconds to wait for gunicorn to respond')
+
+    def _python(self, code, *flags):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'zuckky_ai.settings'))
+        return subprocess.run(
+            [sys.executable, *flags, '-c', code],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+
+    def _measure(self, eager, runs):
+        ready, warm = [], []
+        for _ in range(runs):
+            output = self._python(PROBE.format(eager=EAGER_IMPORTS if eager else ''))
+            # The log listener thread writes to stdout, so the probe reports on stderr
+            line = next(l for l in output.stderr.splitlines() if l.startswith('STARTUP_REPORT'))
+            ready_ms, warm_ms = map(float, line.split()[1:])
+            ready.append(ready_ms)
+            warm.append(warm_ms)
+        return statistics.median(ready), statistics.median(warm)
+
+    def _wait_for_response(self, url, deadline):
+        """Poll `url` until the server answers with any HTTP status"""
+        while time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(url, timeout=deadline - time.monotonic()):
+                    return
+            except urllib.error.HTTPError:
+                return
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise TimeoutError(f'no response from {url}')
+
+    def _measure_gunicorn(self, runs, timeout):
+        """
+        Start gunicorn with the shipped config and time, from launch, the first
+        response and the first /api/warmup/ response (which returns once the
+        Gemini client is primed, waiting on the background warm-up if needed)
+        """
+        first, primed = [], []
+        for _ in range(runs):
+            with socket.socket() as sock:
+                sock.bind(('127.0.0.1', 0))
+                port = sock.getsockname()[1]
+            env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY='1',
+                       DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'zuckky_ai.settings'))
+            base_url = f'http://127.0.0.1:{port}'
+            started = time.monotonic()
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                deadline = started + timeout
+                self._wait_for_response(f'{base_url}/', deadline)
+                first.append((time.monotonic() - started) * 1000)
+                self._wait_for_response(f'{base_url}/api/warmup/', deadline)
+                primed.append((time.monotonic() - started) * 1000)
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+        return statistics.median(first), statistics.median(primed)
+
+    def _slowest_imports(self, top):
+        output = self._python(PROBE.format(eager=''), '-X', 'importtime')
+        rows = []
+        for line in output.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            # Only top-level entries, nested ones are already counted by their parent
+            if not name.startswith(' ' * 2):
+                rows.append((int(cumulative) / 1000, name.strip()))
+        return sorted(rows, reverse=True)[:top]
+
+    def handle(self, *args, **options):
+        runs = options['runs']
+        first_ms, primed_ms = self._measure_gunicorn(runs, options['timeout'])
+        self.stdout.write(f"Under gunicorn.conf.py (median of {runs} launches, from process start)")
+        self.stdout.write(f"  first response:          {first_ms:>8.0f} ms")
+        self.stdout.write(f"  Gemini client primed:    {primed_ms:>8.0f} ms")
+
+        eager_ready, eager_warm = self._measure(True, runs)
+        lazy_ready, lazy_warm = self._measure(False, runs)
+        self.stdout.write('')
+        self.stdout.write(f"Import budget (median of {runs} fresh interpreters, no server)")
+        self.stdout.write(f"{'':<24}{'ready ms':>10}{'warm-up ms':>12}{'total ms':>10}")
+        for label, ready, warm in (('eager heavy imports', eager_ready, eager_warm),
+                                   ('lazy heavy imports', lazy_ready, lazy_warm)):
+            self.stdout.write(f"{label:<24}{ready:>10.0f}{warm:>12.0f}{ready + warm:>10.0f}")
+
+        self.stdout.write('')
+        self.stdout.write("Slowest top-level imports (lazy, cumulative ms):")
+        for ms, name in self._slowest_imports(options['top']):
+            self.stdout.write(f"{ms:>10.1f}  {name}")
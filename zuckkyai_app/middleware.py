@@ -0,0 +1,22 @@
+import time
+
+from .utils import metrics
+
+
+class MetricsMiddleware:
+    """Time every request and periodically flush this worker's metrics snapshot"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unmatched'
+        metrics.http_request_duration.observe(elapsed, view=view, method=request.method)
+        metrics.http_requests.inc(view=view, method=request.method, status=response.status_code)
+        metrics.registry.flush()
+        return response
@@ -1,3 +1,711 @@
-from django.test import TestCase
+import io
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+
+from .utils.audio import SAMPLE_RATE, WINDOW_SECONDS, build_cut_list, detect_silences, windowed_rms_db
+from .utils import gemini_client, media
+from .utils.fingerprint import COLOR_BINS, fingerprint_to_parameters
+from .utils.log import JsonFormatter, NonBlockingQueueHandler, SamplingFilter, truncate
+from .utils.jobs import JobRunner, cancel_marker_path, request_cancel
+from .utils.metrics import Counter, Gauge, Histogram, MetricsRegistry
+from .utils.runtime import write_json_atomic
+from .utils.scenes import BoundaryTracker, HISTOGRAM_BINS, luma_histograms, score_batch
+from .utils.scheduler import FairShareQueue, QueuedJob, priority_rank
+from .utils.video_processor import VideoProcessor
+
+
+def make_job(task_id, user, priority='normal', cost=10.0, estimated_seconds=None, group=None):
+    return QueuedJob(task_id=task_id, user=user, priority=priority_rank(priority), cost=cost,
+                     estimated_seconds=cost if estimated_seconds is None else estimated_seconds, group=group)
+
+
+def drain(queue):
+    """Pop everything, finishing each job right away so caps never block"""
+    order = []
+    while True:
+        job = queue.pop()
+        if job is None:
+            return order
+        queue.finished(job.task_id)
+        order.append(job.task_id)
+
+
+class FairShareQueueTests(SimpleTestCase):
+    def test_higher_priority_runs_first(self):
+        queue = FairShareQueue(max_per_user=10, user_weights={})
+        queue.push(make_job('low', 'a', priority='low'))
+        queue.push(make_job('normal', 'b'))
+        queue.push(make_job('high', 'c', priority='high'))
+        self.assertEqual(drain(queue), ['high', 'normal', 'low'])
+
+    def test_users_share_fairly(self):
+        queue = FairShareQueue(max_per_user=10, user_weights={})
+        for i in range(3):
+            queue.push(make_job(f'a{i}', 'a'))
+        queue.push(make_job('b0', 'b'))
+        # b's single job is not stuck behind all of a's
+        self.assertEqual(drain(queue), ['a0', 'b0', 'a1', 'a2'])
+
+    def test_user_weights_scale_share(self):
+        queue = FairShareQueue(max_per_user=10, user_weights={'a': 2.0})
+        for i in range(4):
+            queue.push(make_job(f'a{i}', 'a'))
+            queue.push(make_job(f'b{i}', 'b'))
+        first_six = drain(queue)[:6]
+        # Twice the weight: while both have work, a gets two dispatches for each of b's
+        self.assertEqual(sum(task_id.startswith('a') for task_id in first_six), 4)
+
+    def test_per_user_cap(self):
+        queue = FairShareQueue(max_per_user=1, user_weights={})
+        queue.push(make_job('a0', 'a'))
+        queue.push(make_job('a1', 'a'))
+        self.assertEqual(queue.pop().task_id, 'a0')
+        self.assertIsNone(queue.pop())
+        self.assertEqual(queue.running, 1)
+        queue.finished('a0')
+        self.assertEqual(queue.pop().task_id, 'a1')
+
+    def test_cap_does_not_block_other_users(self):
+        queue = FairShareQueue(max_per_user=1, user_weights={})
+        queue.push(make_job('a0', 'a'))
+        queue.push(make_job('a1', 'a'))
+        queue.push(make_job('b0', 'b'))
+        self.assertEqual([queue.pop().task_id, queue.pop().task_id], ['a0', 'b0'])
+        self.assertIsNone(queue.pop())
+
+    def test_batch_within_slots_dispatches_at_once(self):
+        queue = FairShareQueue(max_per_user=1, user_weights={}, max_per_group=4)
+        for i in range(4):
+            queue.push(make_job(f'v{i}', 'a', group='group_1'))
+        forecast = queue.forecast(slots=4)
+        now = time.time()
+        for i in range(4):
+            self.assertAlmostEqual(forecast[f'v{i}']['expected_start_at'], now, delta=1)
+        self.assertEqual(sorted(queue.pop().task_id for _ in range(4)), ['v0', 'v1', 'v2', 'v3'])
+        self.assertEqual(queue.running, 4)
+
+    def test_batch_limited_to_max_per_group(self):
+        queue = FairShareQueue(max_per_user=1, user_weights={}, max_per_group=2)
+        for i in range(3):
+            queue.push(make_job(f'v{i}', 'a', group='group_1'))
+        queue.pop()
+        queue.pop()
+        self.assertIsNone(queue.pop())
+        self.assertEqual(queue.forecast(slots=4)['v2']['queue_position'], 1)
+
+    def test_batch_counts_once_against_user_cap(self):
+        queue = FairShareQueue(max_per_user=1, user_weights={}, max_per_group=4)
+        queue.push(make_job('v0', 'a', group='group_1'))
+        queue.push(make_job('v1', 'a', group='group_1'))
+        queue.push(make_job('single', 'a', cost=1.0))
+        self.assertEqual(queue.pop().task_id, 'single')
+        # The user's one unit is taken by a lone job, so the batch waits for it
+        self.assertIsNone(queue.pop())
+        queue.finished('single')
+        self.assertEqual(sorted([queue.pop().task_id, queue.pop().task_id]), ['v0', 'v1'])
+
+    def test_shortest_job_first_within_user(self):
+        queue = FairShareQueue(max_per_user=10, user_weights={})
+        queue.push(make_job('long', 'a', cost=100.0))
+        queue.push(make_job('short', 'a', cost=5.0))
+        queue.push(make_job('medium', 'a', cost=30.0))
+        self.assertEqual(drain(queue), ['short', 'medium', 'long'])
+
+    def test_remove(self):
+        queue = FairShareQueue(max_per_user=10, user_weights={})
+        queue.push(make_job('a0', 'a'))
+        queue.push(make_job('a1', 'a'))
+        self.assertEqual(queue.remove('a0').task_id, 'a0')
+        self.assertNotIn('a0', queue)
+        self.assertEqual(drain(queue), ['a1'])
+
+    def test_forecast_matches_dispatch_order(self):
+        queue = FairShareQueue(max_per_user=10, user_weights={})
+        for i in range(2):
+            queue.push(make_job(f'a{i}', 'a'))
+        queue.push(make_job('b0', 'b'))
+        forecast = queue.forecast(slots=1)
+        by_position = sorted(forecast, key=lambda task_id: forecast[task_id]['queue_position'])
+        self.assertEqual(by_position, ['a0', 'b0', 'a1'])
+        # Forecasting does not dispatch anything
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(drain(queue), by_position)
+
+    def test_forecast_start_times_on_free_slots(self):
+        queue = FairShareQueue(max_per_user=10, user_weights={})
+        queue.push(make_job('a0', 'a', cost=10.0))
+        queue.push(make_job('b0', 'b', cost=10.0))
+        queue.push(make_job('c0', 'c', cost=10.0))
+        now = time.time()
+        forecast = queue.forecast(slots=2)
+        self.assertAlmostEqual(forecast['a0']['expected_start_at'], now, delta=1)
+        self.assertAlmostEqual(forecast['b0']['expected_start_at'], now, delta=1)
+        self.assertAlmostEqual(forecast['c0']['expected_start_at'], now + 10, delta=1)
+
+    def test_forecast_waits_for_capped_user(self):
+        queue = FairShareQueue(max_per_user=1, user_weights={})
+        queue.push(make_job('a0', 'a', cost=10.0))
+        queue.push(make_job('a1', 'a', cost=10.0))
+        now = time.time()
+        forecast = queue.forecast(slots=2)
+        # A slot is free, but a1 cannot start until a0 ends
+        self.assertAlmostEqual(forecast['a0']['expected_start_at'], now, delta=1)
+        self.assertAlmostEqual(forecast['a1']['expected_start_at'], now + 10, delta=1)
+        self.assertEqual(forecast['a1']['queue_position'], 2)
+
+    def test_forecast_accounts_for_running_jobs(self):
+        queue = FairShareQueue(max_per_user=1, user_weights={})
+        queue.push(make_job('a0', 'a', cost=20.0))
+        queue.push(make_job('a1', 'a', cost=10.0))
+        queue.push(make_job('b0', 'b', cost=10.0))
+        # a1 (shorter) is dispatched first and is now running
+        self.assertEqual(queue.pop().task_id, 'a1')
+        now = time.time()
+        forecast = queue.forecast(slots=2)
+        self.assertEqual(set(forecast), {'a0', 'b0'})
+        self.assertAlmostEqual(forecast['b0']['expected_start_at'], now, delta=1)
+        self.assertAlmostEqual(forecast['a0']['expected_start_at'], now + 10, delta=1)
+
+
+def synthetic_speech(duration, silences):
+    """int16 mono PCM: a 440 Hz tone with near-silent gaps at the given (start, end) seconds"""
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    signal = 0.3 * 32767 * np.sin(2 * np.pi * 440 * t)
+    rng = np.random.default_rng(0)
+    for start, end in silences:
+        gap = slice(int(start * SAMPLE_RATE), int(end * SAMPLE_RATE))
+        signal[gap] = rng.normal(0, 5, gap.stop - gap.start)
+    return signal.astype(np.int16)
+
+
+def chunked(samples, size):
+    return (samples[i:i + size] for i in range(0, len(samples), size))
+
+
+class AudioAnalysisTests(SimpleTestCase):
+    # Gaps include one across the 30 s (480000-sample) chunk edge, one too short
+    # to count, and one still open when the stream ends
+    SILENCES = [(3.0, 4.2), (7.5, 7.7), (29.0, 31.5), (38.0, 40.0)]
+
+    def setUp(self):
+        # Slightly more than 40 s so the last window is partial
+        self.samples = synthetic_speech(40.013, self.SILENCES)
+
+    def analyze(self, chunk_size, pace='medium'):
+        levels = list(windowed_rms_db(chunked(self.samples, chunk_size)))
+        silences, duration = detect_silences(iter(levels), min_silence=0.5)
+        return np.concatenate(levels), silences, duration, build_cut_list(silences, duration, pace)
+
+    def test_results_do_not_depend_on_chunk_size(self):
+        whole = self.analyze(len(self.samples))
+        for chunk_size in (480000, 12345):
+            levels, silences, duration, cuts = self.analyze(chunk_size)
+            np.testing.assert_allclose(levels, whole[0], atol=1e-4)
+            self.assertEqual(silences, whole[1])
+            self.assertEqual(duration, whole[2])
+            self.assertEqual(cuts, whole[3])
+
+    def test_silences_found(self):
+        _, silences, duration, _ = self.analyze(12345)
+        self.assertAlmostEqual(duration, 40.013, delta=WINDOW_SECONDS)
+        expected = [(3.0, 4.2), (29.0, 31.5), (38.0, 40.0)]
+        self.assertEqual(len(silences), len(expected))
+        for (start, end), (expected_start, expected_end) in zip(silences, expected):
+            self.assertAlmostEqual(start, expected_start, delta=WINDOW_SECONDS)
+            self.assertAlmostEqual(end, expected_end, delta=WINDOW_SECONDS)
+
+    def test_silence_open_at_end_of_stream(self):
+        samples = synthetic_speech(2.0, [(1.0, 2.0)])
+        silences, duration = detect_silences(windowed_rms_db(chunked(samples, 777)), min_silence=0.5)
+        self.assertEqual(len(silences), 1)
+        self.assertAlmostEqual(silences[0][0], 1.0, delta=WINDOW_SECONDS)
+        self.assertAlmostEqual(silences[0][1], duration)
+
+    def test_cut_list_pads_and_drops_short_segments(self):
+        silences = [(1.0, 2.0), (2.1, 4.0)]
+        cuts = build_cut_list(silences, 6.0, pace='medium')
+        # 0-1 s and 4-6 s are kept with 0.15 s padding; 2.0-2.1 s is under min_keep even padded
+        self.assertEqual(cuts, [{'start': 0.0, 'end': 1.15}, {'start': 3.85, 'end': 6.0}])
+
+
+class TempStorageTestCase(SimpleTestCase):
+    """Task records, queue forecasts and metrics in a throwaway directory"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='zuckky_test_')
+        overrides = override_settings(MEDIA_ROOT=f'{self.tmpdir}/media', RENDER_QUEUE_DIR=f'{self.tmpdir}/render_queue',
+                                      METRICS_DIR=f'{self.tmpdir}/metrics')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+
+
+class BatchStatusTests(TempStorageTestCase):
+    def batch_status(self, *states):
+        processor = VideoProcessor()
+        variants = []
+        for i, state in enumerate(states):
+            task_id = f'task_{i}'
+            processor._save_processing_details(task_id, {'task_id': task_id, 'status': state, 'progress': 0,
+                                                       'started_at': time.time()})
+            variants.append({'template_style': 'default', 'task_id': task_id})
+        processor._save_record('processing_groups/group_test.json', {'group_id': 'group_test', 'variants': variants})
+        return processor.get_batch_status('group_test')
+
+    def test_all_canceled(self):
+        status = self.batch_status('canceled', 'canceled')
+        self.assertEqual(status['status'], 'canceled')
+        self.assertEqual(status['canceled'], 2)
+
+    def test_canceled_variants_are_not_errors(self):
+        self.assertEqual(self.batch_status('completed', 'canceled')['status'], 'completed')
+        self.assertEqual(self.batch_status('completed', 'canceled', 'failed')['status'], 'completed_with_errors')
+        self.assertEqual(self.batch_status('canceled', 'failed')['status'], 'failed')
+
+    def test_unfinished_variant_keeps_batch_processing(self):
+        self.assertEqual(self.batch_status('completed', 'processing')['status'], 'processing')
+
+
+@override_settings(CANCEL_POLL_INTERVAL=0.05)
+class JobCancelTests(TempStorageTestCase):
+    def test_cancel_queued_job(self):
+        runner = JobRunner(max_workers=1)
+        ran, finished = [], []
+        blocker_started = threading.Event()
+        blocker = runner.submit('blocker', lambda context: (blocker_started.set(), context.sleep(30)))
+        self.assertTrue(blocker_started.wait(5))
+        queued = runner.submit('queued', lambda context: ran.append(context.task_id),
+                               on_finish=lambda task_id, outcome, error: finished.append((task_id, outcome)))
+        self.assertTrue(runner.cancel('queued'))
+        self.assertEqual(queued.result(timeout=1), 'canceled')
+        self.assertEqual(finished, [('queued', 'canceled')])
+        runner.cancel('blocker')
+        self.assertEqual(blocker.result(timeout=5), 'canceled')
+        self.assertEqual(ran, [])
+
+    def test_cancel_running_subprocess(self):
+        runner = JobRunner(max_workers=1)
+        contexts = []
+        started = threading.Event()
+
+        def render(context):
+            contexts.append(context)
+            started.set()
+            context.run(['sleep', '60'])
+
+        future = runner.submit('sleeper', render)
+        self.assertTrue(started.wait(5))
+        deadline = time.time() + 5
+        while not contexts[0]._processes and time.time() < deadline:
+            time.sleep(0.01)
+        process = contexts[0]._processes[0]
+
+        canceled_at = time.time()
+        self.assertTrue(runner.cancel('sleeper'))
+        self.assertEqual(future.result(timeout=settings.CANCEL_TIMEOUT), 'canceled')
+        self.assertLess(time.time() - canceled_at, settings.CANCEL_TIMEOUT)
+        self.assertIsNotNone(process.poll())
+        self.assertFalse(runner.is_running('sleeper'))
+        # The only slot is free again
+        self.assertEqual(runner.submit('next', lambda context: None).result(timeout=settings.CANCEL_TIMEOUT), 'completed')
+
+    def test_cancel_through_marker_from_another_runner(self):
+        owner, other = JobRunner(max_workers=1), JobRunner(max_workers=1)
+        started = threading.Event()
+        future = owner.submit('elsewhere', lambda context: (started.set(), context.sleep(30)))
+        self.assertTrue(started.wait(5))
+        self.assertFalse(other.cancel('elsewhere'))
+        request_cancel('elsewhere')
+        self.assertEqual(future.result(timeout=settings.CANCEL_TIMEOUT), 'canceled')
+        self.assertFalse(default_storage.exists(cancel_marker_path('elsewhere')))
+
+
+class CancelViewTests(TempStorageTestCase):
+    def start_batch(self, styles):
+        upload = self.client.post('/api/upload/', {'video': SimpleUploadedFile('clip.mp4', b'not really a video'),
+                                                   'type': 'main'}).json()
+        response = self.client.post('/api/process-batch/', json.dumps({'main_video': upload['file_path'], 'styles': styles}),
+                                    content_type='application/json').json()
+        self.assertTrue(response['success'], response)
+        return response['group_id']
+
+    def test_cancel_batch(self):
+        group_id = self.start_batch(['Gary Vee', 'default'])
+        response = self.client.post(f'/api/cancel/{group_id}/').json()
+        self.assertTrue(response['success'])
+        self.assertEqual(len(response['canceled']), 2)
+        status = self.client.get(f'/api/batch-status/{group_id}/').json()['status']
+        self.assertEqual(status['status'], 'canceled')
+        self.assertEqual(status['canceled'], 2)
+
+    def test_cancel_unknown_batch(self):
+        response = self.client.post('/api/cancel/group_missing/').json()
+        self.assertFalse(response['success'])
+        self.assertEqual(response['canceled'], [])
+
+    def test_cancel_requires_post(self):
+        self.assertFalse(self.client.get('/api/cancel/group_missing/').json()['success'])
+
+
+class OrphanedTaskTests(TempStorageTestCase):
+    def test_task_of_exited_worker_fails(self):
+        processor = VideoProcessor()
+        processor._save_processing_details('orphan', {'task_id': 'orphan', 'status': 'processing', 'progress': 40,
+                                                      'started_at': time.time(), 'owner': '999999999-deadbeef'})
+        self.assertEqual(processor.get_processing_status('orphan')['status'], 'failed')
+        self.assertEqual(processor._get_processing_details('orphan')['status'], 'failed')
+
+    def test_finish_keeps_canceled(self):
+        processor = VideoProcessor()
+        processor._save_processing_details('late', {'task_id': 'late', 'status': 'canceled', 'started_at': time.time()})
+        processor._finish_job('late', 'completed', None)
+        self.assertEqual(processor._get_processing_details('late')['status'], 'canceled')
+
+
+class MetricsTests(TempStorageTestCase):
+    def make_registry(self):
+        registry = MetricsRegistry()
+        requests = registry.register(Counter('test_requests_total', 'Requests'))
+        running = registry.register(Gauge('test_running', 'Running jobs'))
+        latency = registry.register(Histogram('test_latency_seconds', 'Latency', buckets=(0.1, 1.0)))
+        return registry, requests, running, latency
+
+    def test_counter_merge_and_label_escaping(self):
+        counter = Counter('test_total', 'Test')
+        counter.inc(2, path='a"b\\c\nd')
+        merged = Counter.merge([counter.snapshot(), counter.snapshot()])
+        self.assertEqual(counter.render(merged), ['test_total{path="a\\"b\\\\c\\nd"} 4'])
+
+    def test_histogram_render(self):
+        histogram = Histogram('test_seconds', 'Test', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value, view='home')
+        merged = histogram.merge([histogram.snapshot(), histogram.snapshot()])
+        self.assertEqual(histogram.render(merged), [
+            'test_seconds_bucket{view="home",le="0.1"} 2',
+            'test_seconds_bucket{view="home",le="1.0"} 6',
+            'test_seconds_bucket{view="home",le="+Inf"} 8',
+            'test_seconds_sum{view="home"} 12.1',
+            'test_seconds_count{view="home"} 8',
+        ])
+
+    def test_exited_worker_counts_are_kept(self):
+        registry, requests, running, latency = self.make_registry()
+        requests.inc(view='home')
+        running.set(1)
+        directory = settings.METRICS_DIR
+        dead = {
+            'test_requests_total': [[[['view', 'home']], 5]],
+            'test_running': [[[], 3]],
+            'test_latency_seconds': [[[], [[1, 0, 1], 2.05, 2]]],
+        }
+        write_json_atomic(directory, f'{directory}/999999999-deadbeef.json', dead)
+
+        for _ in range(2):
+            # Rendering twice must not fold the exited worker in twice
+            output = registry.render()
+            self.assertIn('test_requests_total{view="home"} 6', output)
+            self.assertIn('test_running 1', output)
+            self.assertIn('test_latency_seconds_count 2', output)
+            self.assertIn('test_latency_seconds_bucket{le="1.0"} 1', output)
+        self.assertFalse(os.path.exists(f'{directory}/999999999-deadbeef.json'))
+
+
+def log_record(msg='hello', level=logging.INFO, **extra):
+    record = logging.LogRecord('zuckkyai_app.test', level, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class LoggingTests(SimpleTestCase):
+    def test_truncate(self):
+        self.assertEqual(truncate('abcdef', 4), 'abcd...[2 more chars]')
+        self.assertEqual(truncate('abcd', 4), 'abcd')
+        self.assertEqual(truncate(123456, 2), 123456)
+
+    def test_prepare_truncates_message_and_extra_fields(self):
+        handler = NonBlockingQueueHandler(max_length=5)
+        record = handler.prepare(log_record('x' * 8, path='y' * 10))
+        self.assertEqual(record.msg, 'xxxxx...[3 more chars]')
+        self.assertEqual(record.path, 'yyyyy...[5 more chars]')
+
+    def test_sampling_keeps_warnings(self):
+        drop_all = SamplingFilter(rate=0.0)
+        self.assertFalse(drop_all.filter(log_record(level=logging.INFO)))
+        self.assertTrue(drop_all.filter(log_record(level=logging.WARNING)))
+        self.assertTrue(SamplingFilter(rate=1.0).filter(log_record(level=logging.DEBUG)))
+
+    def test_full_queue_drops_and_reports_count(self):
+        handler = NonBlockingQueueHandler(queue_size=1)
+        for _ in range(3):
+            handler.enqueue(handler.prepare(log_record()))
+        # The third record carried the count of the second, and was dropped too
+        self.assertEqual(handler.dropped, 2)
+        handler.queue.get_nowait()
+        record = handler.prepare(log_record())
+        self.assertEqual(record.dropped_before, 2)
+        self.assertEqual(handler.dropped, 0)
+
+    def test_listener_writes_json(self):
+        stream = io.StringIO()
+        handler = NonBlockingQueueHandler(stream=stream)
+        handler.setFormatter(JsonFormatter())
+        handler.emit(log_record('started', task_id='t1'))
+        deadline = time.time() + 5
+        while not stream.getvalue() and time.time() < deadline:
+            time.sleep(0.01)
+        line = json.loads(stream.getvalue())
+        self.assertEqual((line['msg'], line['task_id']), ('started', 't1'))
+
+    def test_forked_child_gets_its_own_queue(self):
+        handler = NonBlockingQueueHandler(stream=io.StringIO())
+        handler.emit(log_record())
+        parent_queue = handler.queue
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            fresh = handler.queue is not parent_queue and handler.queue.empty() and handler._listener is None
+            os.write(write_fd, b'1' if fresh else b'0')
+            os._exit(0)
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+        with os.fdopen(read_fd, 'rb') as result:
+            self.assertEqual(result.read(), b'1')
+
+
+class ContentHashTests(TempStorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = default_storage.save('uploads/main/clip.mp4', ContentFile(b'frame' * 1000))
+        self.reads = 0
+        real_open = default_storage.open
+
+        def counting_open(name, mode='rb'):
+            if name == self.path:
+                self.reads += 1
+            return real_open(name, mode)
+
+        default_storage.open = counting_open
+        self.addCleanup(delattr, default_storage, 'open')
+
+    def test_file_is_read_once(self):
+        first = media.content_hash(self.path)
+        self.assertEqual(media.content_hash(self.path), first)
+        self.assertEqual(self.reads, 1)
+
+    def test_concurrent_callers_share_one_read(self):
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            digests = set(pool.map(lambda _: media.content_hash(self.path), range(4)))
+        self.assertEqual(len(digests), 1)
+        self.assertEqual(self.reads, 1)
+
+    def test_changed_file_is_rehashed(self):
+        first = media.content_hash(self.path)
+        with open(default_storage.path(self.path), 'ab') as f:
+            f.write(b'more')
+        self.assertNotEqual(media.content_hash(self.path), first)
+        self.assertEqual(self.reads, 2)
+
+
+def synthetic_shots(lengths, height=36, width=64):
+    """Luma frames: one flat gray level per shot, with light noise"""
+    rng = np.random.default_rng(1)
+    levels = [30, 200, 90, 240, 10, 150]
+    frames = [np.full((length, height, width), levels[i % len(levels)], dtype=np.int16) for i, length in enumerate(lengths)]
+    frames = np.concatenate(frames) + rng.integers(-3, 4, size=(sum(lengths), height, width))
+    return np.clip(frames, 0, 255).astype(np.uint8)
+
+
+class SceneDetectionTests(SimpleTestCase):
+    # Cuts at frames 40, 43 (too soon after 40 to count), 300 and 301 (too soon again), 556
+    SHOTS = [40, 3, 257, 1, 255, 44]
+
+    def test_histograms_are_normalized(self):
+        frames = synthetic_shots([2, 2])
+        histograms = luma_histograms(frames)
+        self.assertEqual(histograms.shape, (4, HISTOGRAM_BINS))
+        np.testing.assert_allclose(histograms.sum(axis=1), 1.0)
+
+    def test_score_batch_carries_previous_frame(self):
+        frames = synthetic_shots([5, 5])
+        whole = score_batch(frames)
+        first, second = score_batch(frames[:3]), score_batch(frames[3:], previous=frames[2])
+        for whole_scores, first_scores, second_scores in zip(whole, first, second):
+            np.testing.assert_allclose(np.concatenate((first_scores, second_scores)), whole_scores)
+        self.assertEqual(whole[0][0], 0.0)
+
+    def boundaries(self, frames, batch_size):
+        tracker = BoundaryTracker(fps=10)
+        for start in range(0, len(frames), batch_size):
+            tracker.add(frames[start:start + batch_size])
+        return tracker.boundaries, tracker.duration
+
+    def test_results_do_not_depend_on_batch_size(self):
+        frames = synthetic_shots(self.SHOTS)
+        whole = self.boundaries(frames, len(frames))
+        self.assertEqual(whole, ([4.0, 30.0, 55.6], 60.0))
+        for batch_size in (256, 41, 7):
+            self.assertEqual(self.boundaries(frames, batch_size), whole)
+
+
+def color_histograms(red_bin, blue_bin):
+    def one_hot(index):
+        return [1.0 if i == index else 0.0 for i in range(COLOR_BINS)]
+    return {'r': one_hot(red_bin), 'g': one_hot(COLOR_BINS // 2), 'b': one_hot(blue_bin)}
+
+
+class FingerprintParameterTests(SimpleTestCase):
+    def test_short_shots_map_to_fast_pace(self):
+        params = fingerprint_to_parameters({'shot_seconds': {'p50': 1.2}, 'cut_rate_per_min': 40.0})
+        self.assertEqual((params['pace'], params['transitions']), ('high', 'hard'))
+        self.assertEqual(params['target_shot_seconds'], 1.2)
+        self.assertEqual(params['cut_rate_per_min'], 40.0)
+
+    def test_long_shots_map_to_conversational_pace(self):
+        params = fingerprint_to_parameters({'shot_seconds': {'p50': 8.0}})
+        self.assertEqual((params['pace'], params['transitions']), ('conversational', 'smooth'))
+        self.assertEqual(fingerprint_to_parameters({'shot_seconds': {'p50': 4.5}})['pace'], 'medium')
+
+    def test_color_grade(self):
+        warm = {'color': {'histograms': color_histograms(COLOR_BINS - 1, 0), 'saturation': 0.5, 'brightness': 0.6}}
+        params = fingerprint_to_parameters(warm)
+        self.assertEqual(params['color_grade'], 'warm')
+        self.assertEqual((params['saturation'], params['brightness']), (0.5, 0.6))
+        cool = {'color': {'histograms': color_histograms(0, COLOR_BINS - 1)}}
+        self.assertEqual(fingerprint_to_parameters(cool)['color_grade'], 'cool')
+        neutral = {'color': {'histograms': color_histograms(4, 4)}}
+        self.assertEqual(fingerprint_to_parameters(neutral)['color_grade'], 'natural')
+
+    def test_loudness(self):
+        params = fingerprint_to_parameters({'loudness': {'mean_db': -18.5, 'silence_ratio': 0.01}})
+        self.assertEqual(params['loudness_target_db'], -18.5)
+        self.assertTrue(params['trim_silence'])
+        self.assertFalse(fingerprint_to_parameters({'loudness': {'mean_db': -30, 'silence_ratio': 0.2}})['trim_silence'])
+
+    def test_empty_fingerprint(self):
+        self.assertEqual(fingerprint_to_parameters({'shot_seconds': {'p50': None}, 'loudness': None}),
+                         {'style': 'custom', 'style_transfer': True, 'cut_rate_per_min': None})
+
+    def test_worker_module_does_not_load_django(self):
+        result = subprocess.run(
+            [sys.executable, '-c', "import sys, zuckkyai_app.utils.fingerprint; print('django' in sys.modules)"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+
+class CostHintTests(SimpleTestCase):
+    def test_duration_then_size(self):
+        processor = VideoProcessor()
+        self.assertEqual(processor._cost_hint({'duration': 42.0, 'size': 10_000_000}), 42.0)
+        with self.settings(RENDER_COST_BYTES_PER_SECOND=1_000_000):
+            self.assertEqual(processor._cost_hint({'duration': None, 'size': 90_000_000}), 90.0)
+        self.assertIsNone(processor._cost_hint({'duration': None, 'size': None}))
+
+
+class ProcessBatchTests(TempStorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.main_video = default_storage.save('uploads/main/clip.mp4', ContentFile(b'not really a video'))
+
+    def post(self, **data):
+        data.setdefault('main_video', self.main_video)
+        return self.client.post('/api/process-batch/', json.dumps(data), content_type='application/json').json()
+
+    def stored_tasks(self):
+        _, names = default_storage.listdir('processing_tasks')
+        tasks = []
+        for name in names:
+            if name.endswith('.json'):
+                with default_storage.open(f'processing_tasks/{name}', 'r') as f:
+                    tasks.append(json.load(f))
+        return tasks
+
+    def test_styles_must_be_a_list(self):
+        response = self.post(styles='Gary Vee')
+        self.assertFalse(response['success'])
+        self.assertIn('styles must be a list', response['error'])
+
+    def test_malformed_variant(self):
+        for variants, error in (
+            ([{'template_style': 'Gary Vee'}, 'default'], 'variant 1 must be an object'),
+            ([{'instructions': 'faster'}], 'variant 0 needs a template_style string'),
+            ([{'template_style': 'default', 'instructions': ['faster']}], 'variant 0 instructions must be a string'),
+        ):
+            response = self.post(variants=variants)
+            self.assertFalse(response['success'])
+            self.assertEqual(response['error'], error)
+        self.assertFalse(default_storage.exists('processing_tasks'))
+
+    @override_settings(BATCH_MAX_VARIANTS=2)
+    def test_too_many_variants(self):
+        response = self.post(styles=['Gary Vee', 'default', 'Alex Hormozi'])
+        self.assertFalse(response['success'])
+        self.assertEqual(response['error'], 'At most 2 variants per batch')
+
+    def test_no_variants(self):
+        self.assertEqual(self.post(styles=[])['error'], 'Provide at least one style or variant')
+
+    def test_missing_upload(self):
+        self.assertFalse(self.post(main_video='uploads/main/missing.mp4', styles=['default'])['success'])
+
+    def test_priority(self):
+        self.assertEqual(self.post(styles=['default'], priority='urgent')['error'], 'Unknown priority: urgent')
+        self.assertEqual(self.post(styles=['default'], priority='high')['error'], "Priority 'high' is reserved for staff")
+
+    def test_failed_start_cancels_started_siblings(self):
+        original = VideoProcessor._mock_start_processing
+
+        def start(processor, main_video_path, reference_video_path, template_style, *args, **kwargs):
+            if template_style == 'Alex Hormozi':
+                raise RuntimeError('render backend unavailable')
+            return original(processor, main_video_path, reference_video_path, template_style, *args, **kwargs)
+
+        with mock.patch.object(VideoProcessor, '_mock_start_processing', start):
+            response = self.post(styles=['Gary Vee', 'Alex Hormozi', 'default'])
+        self.assertFalse(response['success'])
+        self.assertEqual(response['error'], 'render backend unavailable')
+        tasks = self.stored_tasks()
+        self.assertEqual(sorted(task['template_style'] for task in tasks), ['Gary Vee', 'default'])
+        self.assertEqual({task['status'] for task in tasks}, {'canceled'})
+        self.assertFalse(default_storage.exists('processing_groups'))
+
+    def test_batch_starts_every_variant(self):
+        response = self.post(styles=['Gary Vee', 'default'])
+        self.assertTrue(response['success'])
+        self.assertEqual(response['variant_count'], 2)
+        tasks = self.stored_tasks()
+        self.assertEqual({task['group_id'] for task in tasks}, {response['group_id']})
+        self.client.post(f"/api/cancel/{response['group_id']}/")
+
+
+class GeminiClientTests(SimpleTestCase):
+    def test_concurrent_first_use_creates_one_client(self):
+        created = []
+
+        def slow_client():
+            time.sleep(0.05)
+            created.append(object())
+            return created[-1]
+
+        with mock.patch.object(gemini_client, '_client', None), \
+                mock.patch.object(gemini_client, 'GeminiClient', side_effect=slow_client):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                clients = set(map(id, pool.map(lambda _: gemini_client.get_gemini_client(), range(8))))
+        self.assertEqual(len(created), 1)
+        self.assertEqual(clients, {id(created[0])})
@@ -7,4 +7,9 @@ urlpatterns = [
     path('api/upload/', views.upload_video, name='upload_video'),
     path('api/process-video/', views.process_video, name='process_video'),
     path('api/status/<str:task_id>/', views.check_processing_status, name='check_status'),
+    path('api/cancel/<str:task_id>/', views.cancel_processing, name='cancel_processing'),
+    path('api/process-batch/', views.process_batch, name='process_batch'),
+    path('api/batch-status/<str:group_id>/', views.check_batch_status, name='check_batch_status'),
+    path('api/warmup/', views.warmup, name='warmup'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+Audio energy and silence analysis for cut-heavy presets (fast_cuts).
+
+Audio is decoded once by ffmpeg to mono 16-bit PCM and consumed as a
+stream of fixed-size chunks, so memory stays bounded regardless of input
+length. Windowed RMS energy and silence detection are vectorized with
+NumPy per chunk, carrying partial windows and open silences across chunk
+boundaries.
+
+The analysis itself only needs NumPy, so the fingerprint worker process can
+import it without loading Django; storage and metrics are imported where
+they are used.
+"""
+import logging
+import shutil
+import subprocess
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+WINDOW_SECONDS = 0.02
+CHUNK_SECONDS = 30
+SILENCE_THRESHOLD_DB = -40.0
+
+# How aggressively silence is removed, keyed by the template's `pace`
+PACE_SETTINGS = {
+    'high': {'min_silence': 0.25, 'padding': 0.05, 'min_keep': 0.3},
+    'medium': {'min_silence': 0.5, 'padding': 0.15, 'min_keep': 0.5},
+    'conversational': {'min_silence': 0.9, 'padding': 0.25, 'min_keep': 0.8},
+}
+
+
+class AudioUnavailable(Exception):
+    pass
+
+
+def decode_pcm(storage_path, context=None, sample_rate=SAMPLE_RATE, chunk_seconds=CHUNK_SECONDS):
+    """
+    Yield int16 NumPy chunks of mono PCM decoded by ffmpeg.
+    With a JobContext, ffmpeg is killed if the job is canceled.
+    """
+    from .media import local_path
+    ffmpeg = shutil.which('ffmpeg')
+    path = local_path(storage_path)
+    if not ffmpeg or not path:
+        raise AudioUnavailable('ffmpeg is not installed' if not ffmpeg else 'storage has no local paths')
+
+    args = [ffmpeg, '-nostdin', '-v', 'error', '-i', path, '-vn', '-ac', '1', '-ar', str(sample_rate),
+            '-f', 's16le', '-acodec', 'pcm_s16le', '-']
+    popen = context.popen if context else subprocess.Popen
+    process = popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    chunk_bytes = int(sample_rate * chunk_seconds) * 2
+    decoded = False
+    try:
+        while True:
+            data = process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            if context:
+                context.check()
+            decoded = True
+            # An odd trailing byte can only come from a truncated stream
+            yield np.frombuffer(data[:len(data) - len(data) % 2], dtype='<i2')
+    finally:
+        process.stdout.close()
+        process.wait()
+    if context:
+        context.check()
+    if process.returncode and not decoded:
+        raise AudioUnavailable('no decodable audio stream')
+
+
+def windowed_rms_db(chunks, sample_rate=SAMPLE_RATE, window_seconds=WINDOW_SECONDS):
+    """
+    Turn a stream of PCM chunks into a stream of per-window RMS levels in dBFS.
+    Samples that do not fill a window are carried into the next chunk.
+    """
+    window = max(1, int(sample_rate * window_seconds))
+    carry = np.empty(0, dtype=np.float32)
+    for chunk in chunks:
+        samples = np.concatenate((carry, chunk.astype(np.float32))) if carry.size else chunk.astype(np.float32)
+        usable = samples.size - samples.size % window
+        carry = samples[usable:]
+        if not usable:
+            continue
+        frames = samples[:usable].reshape(-1, window)
+        rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / window)
+        yield 20 * np.log10(rms / 32768.0 + 1e-10)
+    if carry.size:
+        rms = np.sqrt(np.mean(carry * carry))
+        yield np.array([20 * np.log10(rms / 32768.0 + 1e-10)], dtype=np.float32)
+
+
+def detect_silences(levels, window_seconds=WINDOW_SECONDS, threshold_db=SILENCE_THRESHOLD_DB, min_silence=0.5):
+    """
+    Consume a stream of per-window dB levels and return (silences, duration):
+    a list of (start, end) seconds for quiet runs of at least `min_silence`,
+    and the total analyzed duration.
+    """
+    silences = []
+    offset = 0              # window index of the current chunk's first window
+    silence_start = None    # window index where an unfinished silence began
+    min_windows = int(round(min_silence / window_seconds))
+
+    def close(start, end):
+        if end - start >= min_windows:
+            silences.append((float(start * window_seconds), float(end * window_seconds)))
+
+    for chunk in levels:
+        quiet = chunk < threshold_db
+        # Transitions inside the chunk, relative to the state carried from the previous one
+        padded = np.concatenate(([silence_start is not None], quiet)).astype(np.int8)
+        edges = np.flatnonzero(np.diff(padded)) + offset
+        for edge in edges:
+            if silence_start is None:
+                silence_start = edge
+            else:
+                close(silence_start, edge)
+                silence_start = None
+        offset += quiet.size
+
+    if silence_start is not None:
+        close(silence_start, offset)
+    return silences, float(offset * window_seconds)
+
+
+def build_cut_list(silences, duration, pace='high'):
+    """
+    Segments to keep: everything between silences, padded so words are not
+    clipped. Returns a list of {'start', 'end'} in seconds.
+    """
+    tuning = PACE_SETTINGS.get(pace, PACE_SETTINGS['medium'])
+    keeps = []
+    cursor = 0.0
+    for start, end in silences:
+        if start > cursor:
+            keeps.append([max(0.0, cursor - tuning['padding']), min(duration, start + tuning['padding'])])
+        cursor = end
+    if cursor < duration:
+        keeps.append([max(0.0, cursor - tuning['padding']), duration])
+
+    merged = []
+    for start, end in keeps:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [{'start': round(start, 3), 'end': round(end, 3)}
+            for start, end in merged if end - start >= tuning['min_keep']]
+
+
+def analyze_audio(storage_path, pace='high', context=None):
+    """
+    Decode once and produce the silence spans and cut list for the renderer.
+    """
+    from .metrics import span
+    tuning = PACE_SETTINGS.get(pace, PACE_SETTINGS['medium'])
+    with span('analysis.audio'):
+        levels = windowed_rms_db(decode_pcm(storage_path, context))
+        silences, duration = detect_silences(levels, min_silence=tuning['min_silence'])
+    cuts = build_cut_list(silences, duration, pace)
+    kept = sum(cut['end'] - cut['start'] for cut in cuts)
+    logger.info("Audio analysis complete", extra={
+        'path': storage_path, 'duration': round(duration, 2), 'silences': len(silences), 'cuts': len(cuts)
+    })
+    return {
+        'duration': round(duration, 3),
+        'silences': [{'start': round(start, 3), 'end': round(end, 3)} for start, end in silences],
+        'cuts': cuts,
+        'kept_seconds': round(kept, 3),
+    }
@@ -0,0 +1,207 @@
+"""
+Style fingerprints for Custom-template reference videos.
+
+One ffmpeg process decodes the reference once, writing tiny RGB frames to
+stdout and mono PCM to a second pipe. A single pass over both streams
+collects cut rate and shot lengths (via the scene detector's scoring),
+a loudness profile and color histograms. The fingerprint is a small JSON
+document cached by content hash, so reusing a reference never
+re-analyzes it, and fingerprint_to_parameters() maps it onto the
+renderer's style parameters.
+
+Like scene detection, extraction runs in a worker process:
+`python -m zuckkyai_app.utils.fingerprint <path>`.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+import numpy as np
+
+from .audio import SAMPLE_RATE, SILENCE_THRESHOLD_DB, windowed_rms_db
+from .scenes import ANALYSIS_FPS, BATCH_FRAMES, FRAME_HEIGHT, FRAME_WIDTH, BoundaryTracker
+
+COLOR_BINS = 16
+LOUDNESS_WINDOW_SECONDS = 0.5
+PROFILE_POINTS = 32
+
+# Bump when the fingerprint layout or algorithm changes, to invalidate cached results
+FINGERPRINT_VERSION = 1
+
+
+class _AudioCollector(threading.Thread):
+    """Drains the PCM pipe (so ffmpeg never blocks on it) into loudness levels"""
+
+    def __init__(self, pipe):
+        super().__init__(daemon=True)
+        self.pipe = pipe
+        self.levels = []
+
+    def _chunks(self):
+        chunk_bytes = SAMPLE_RATE * 10 * 2
+        while True:
+            data = self.pipe.read(chunk_bytes)
+            if not data:
+                return
+            yield np.frombuffer(data[:len(data) - len(data) % 2], dtype='<i2')
+
+    def run(self):
+        for levels in windowed_rms_db(self._chunks(), window_seconds=LOUDNESS_WINDOW_SECONDS):
+            self.levels.append(levels.astype(np.float32))
+        self.pipe.close()
+
+
+def _decode(path, with_audio):
+    """Start ffmpeg with RGB frames on stdout and, optionally, PCM on a second pipe"""
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        raise RuntimeError('ffmpeg is not installed')
+    args = [ffmpeg, '-nostdin', '-v', 'error', '-i', path,
+            '-map', '0:v:0', '-vf', f'fps={ANALYSIS_FPS},scale={FRAME_WIDTH}:{FRAME_HEIGHT}',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1']
+    if not with_audio:
+        return subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL), None
+
+    read_fd, write_fd = os.pipe()
+    args += ['-map', '0:a:0', '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', f'pipe:{write_fd}']
+    try:
+        process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, pass_fds=(write_fd,))
+    finally:
+        os.close(write_fd)
+    return process, os.fdopen(read_fd, 'rb')
+
+
+def _percentiles(values, points=(10, 25, 50, 75, 90)):
+    if not len(values):
+        return {f'p{p}': None for p in points}
+    return {f'p{p}': round(float(v), 3) for p, v in zip(points, np.percentile(values, points))}
+
+
+def extract_fingerprint(path, with_audio=True):
+    """Single streaming pass over a local video file"""
+    process, audio_pipe = _decode(path, with_audio)
+    collector = None
+    if audio_pipe:
+        collector = _AudioCollector(audio_pipe)
+        collector.start()
+
+    frame_bytes = FRAME_WIDTH * FRAME_HEIGHT * 3
+    luma_weights = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    color_counts = np.zeros((3, COLOR_BINS), dtype=np.int64)
+    brightness_sum = saturation_sum = 0.0
+    tracker = BoundaryTracker()
+    try:
+        while True:
+            data = process.stdout.read(frame_bytes * BATCH_FRAMES)
+            count = len(data) // frame_bytes
+            if not count:
+                break
+            rgb = np.frombuffer(data[:count * frame_bytes], dtype=np.uint8).reshape(count, FRAME_HEIGHT, FRAME_WIDTH, 3)
+
+            # Color: per-channel histograms over the whole batch, plus brightness and saturation
+            shift = 8 - int(np.log2(COLOR_BINS))
+            for channel in range(3):
+                color_counts[channel] += np.bincount((rgb[..., channel] >> shift).ravel(), minlength=COLOR_BINS)
+            channel_max = rgb.max(axis=-1).astype(np.float32)
+            channel_min = rgb.min(axis=-1).astype(np.float32)
+            brightness_sum += float(channel_max.sum()) / 255
+            saturation_sum += float(np.where(channel_max > 0, (channel_max - channel_min) / np.maximum(channel_max, 1), 0).sum())
+
+            # Cuts: same scoring as scene detection, on luma
+            tracker.add((rgb.astype(np.float32) @ luma_weights).astype(np.uint8))
+    finally:
+        process.stdout.close()
+        process.wait()
+        if collector:
+            collector.join()
+
+    frames_seen, boundaries = tracker.frames, tracker.boundaries
+    if process.returncode and not frames_seen:
+        if with_audio:
+            # Most likely a reference without an audio stream
+            return extract_fingerprint(path, with_audio=False)
+        raise RuntimeError(f'ffmpeg exited with status {process.returncode}')
+
+    duration = frames_seen / ANALYSIS_FPS
+    edges = np.array([0.0] + boundaries + [duration])
+    shot_lengths = np.diff(edges)
+    shot_lengths = shot_lengths[shot_lengths > 0]
+    pixels = max(1, frames_seen * FRAME_WIDTH * FRAME_HEIGHT)
+
+    fingerprint = {
+        'version': FINGERPRINT_VERSION,
+        'duration': round(duration, 3),
+        'cut_rate_per_min': round(len(boundaries) / duration * 60, 3) if duration else 0.0,
+        'shot_seconds': dict(_percentiles(shot_lengths), mean=round(float(shot_lengths.mean()), 3)
+                             if shot_lengths.size else None, count=int(shot_lengths.size)),
+        'color': {
+            'histograms': {name: [round(float(v), 4) for v in color_counts[i] / pixels]
+                           for i, name in enumerate(('r', 'g', 'b'))},
+            'brightness': round(brightness_sum / pixels, 4),
+            'saturation': round(saturation_sum / pixels, 4),
+        },
+        'loudness': None,
+    }
+
+    if collector and collector.levels:
+        levels = np.concatenate(collector.levels)
+        # Downsample the level curve to a fixed number of points for a compact shape
+        profile = [round(float(part.mean()), 1) for part in np.array_split(levels, min(PROFILE_POINTS, levels.size))]
+        fingerprint['loudness'] = dict(
+            _percentiles(levels, (10, 50, 90)),
+            mean_db=round(float(levels.mean()), 2),
+            silence_ratio=round(float((levels < SILENCE_THRESHOLD_DB).mean()), 4),
+            profile=profile,
+        )
+    return fingerprint
+
+
+def fingerprint_to_parameters(fingerprint):
+    """Translate a fingerprint into the renderer's style parameters"""
+    params = {'style': 'custom', 'style_transfer': True}
+    median_shot = (fingerprint.get('shot_seconds') or {}).get('p50')
+    if median_shot:
+        params['target_shot_seconds'] = median_shot
+        if median_shot < 2.5:
+            params['pace'] = 'high'
+        elif median_shot < 6:
+            params['pace'] = 'medium'
+        else:
+            params['pace'] = 'conversational'
+        params['transitions'] = 'smooth' if median_shot >= 4 else 'hard'
+    params['cut_rate_per_min'] = fingerprint.get('cut_rate_per_min')
+
+    color = fingerprint.get('color') or {}
+    histograms = color.get('histograms') or {}
+    if histograms:
+        centers = (np.arange(COLOR_BINS) + 0.5) / COLOR_BINS
+        warmth = float(np.dot(histograms['r'], centers) - np.dot(histograms['b'], centers))
+        params['color_grade'] = 'warm' if warmth > 0.05 else 'cool' if warmth < -0.05 else 'natural'
+        params['saturation'] = color.get('saturation')
+        params['brightness'] = color.get('brightness')
+
+    loudness = fingerprint.get('loudness')
+    if loudness:
+        params['loudness_target_db'] = loudness.get('mean_db')
+        params['trim_silence'] = loudness.get('silence_ratio', 0) < 0.05
+    return params
+
+
+def fingerprint_reference(storage_path, context=None):
+    """
+    Fingerprint a stored reference video in a worker process, cached by
+    content hash so a reference reused across renders is analyzed once.
+    """
+    from .media import worker_analysis
+    return worker_analysis('fingerprints', __name__, storage_path, f"v{FINGERPRINT_VERSION}", context)
+
+
+def main(argv):
+    json.dump(extract_fingerprint(argv[1]), sys.stdout, separators=(',', ':'))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
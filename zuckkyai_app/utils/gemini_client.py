@@ -1,5 +1,9 @@
-import google.generativeai as genai
+import logging
+import threading
 from django.conf import settings
+from .metrics import span
+
+logger = logging.getLogger(__name__)
 
 class GeminiClient:
     def __init__(self):
@@ -15,22 +19,24 @@ class GeminiClient:
             'models/gemini-pro', # Some API versions
         ]
         
-        print("🚀 Initializing Gemini client with latest models...")
+        logger.debug("Initializing Gemini client")
+        
+        # Imported on first use: google.generativeai pulls in grpc and protobuf,
+        # which dominate cold-start time
+        import google.generativeai as genai
         
         for model_name in self.available_models:
             try:
                 genai.configure(api_key=settings.GEMINI_API_KEY)
                 self.model = genai.GenerativeModel(model_name)
-                print(f"✅ SUCCESS! Initialized with model: {model_name}")
+                logger.debug("Gemini model initialized", extra={'model': model_name})
                 break
             except Exception as e:
-                print(f"❌ Failed with {model_name}: {e}")
+                logger.warning("Gemini model unavailable", extra={'model': model_name, 'error': str(e)})
                 continue
         
         if not self.model:
-            print("⚠️ No Gemini models available - using fallback mode")
-        else:
-            print("🎉 Gemini AI is ready to help with video editing!")
+            logger.warning("No Gemini models available - using fallback mode")
         
     def get_chat_response(self, user_message, conversation_history=None):
         """Get AI response from Gemini"""
@@ -52,18 +58,20 @@ Keep responses concise and focused on video editing. Guide users through the pro
             # Build conversation
             prompt = f"{context}\n\nUser: {user_message}\n\nZuckky AI:"
             
-            print(f"💬 Sending to Gemini: {user_message}")
+            logger.debug("Sending to Gemini", extra={'user_message': user_message})
             
-            response = self.model.generate_content(prompt)
+            with span('gemini.generate_content'):
+                response = self.model.generate_content(prompt)
             
             if response.text:
-                print(f"🤖 Gemini response: {response.text}")
+                logger.info("Gemini response", extra={'message_chars': len(user_message), 'response_chars': len(response.text)})
+                logger.debug("Gemini response text", extra={'response': response.text})
                 return response.text
             else:
                 return self._get_fallback_response(user_message)
             
         except Exception as e:
-            print(f"❌ Gemini API error: {str(e)}")
+            logger.warning("Gemini API error", extra={'error': str(e)})
             return self._get_fallback_response(user_message)
     
     def _get_fallback_response(self, user_message):
@@ -89,4 +97,20 @@ Keep responses concise and focused on video editing. Guide users through the pro
             return "You're rocking 32 editing credits! 🎉 Each video edit uses just 1 credit. The more you create, the more credits you'll earn! 💫"
         
         else:
-            return "I'm excited to help you create stunning video content! 🎥 To get started, please upload your raw video footage or tell me about the amazing content you want to create! 🚀"
\ No newline at end of file
+            return "I'm excited to help you create stunning video content! 🎥 To get started, please upload your raw video footage or tell me about the amazing content you want to create! 🚀"
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_gemini_client():
+    """
+    Return a process-wide GeminiClient, creating it on first use; callers
+    racing the warm-up thread wait for its client rather than building another
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiClient()
+    return _client
@@ -0,0 +1,334 @@
+"""
+Local render job execution with cooperative, bounded-time cancellation.
+
+Jobs run on a per-process pool of RENDER_WORKERS threads, dispatched in
+fair-share order (see scheduler.py). Each job gets a
+JobContext through which it starts subprocesses, so a cancel can kill
+them and free the worker slot. Cancels can arrive in any gunicorn worker: they leave a
+marker in storage, which the owning process notices within
+CANCEL_POLL_INTERVAL seconds. Queue forecasts are per-process runtime
+files under RENDER_QUEUE_DIR (see runtime.py); the same file tells other
+workers whether a job's owning process is still alive.
+"""
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .metrics import active_tasks, queue_depth, registry, span
+from .scheduler import FairShareQueue, QueuedJob, priority_rank
+from .runtime import process_alive, process_id, read_process_files, write_process_file
+
+logger = logging.getLogger(__name__)
+
+
+class JobCanceled(Exception):
+    pass
+
+
+def cancel_marker_path(task_id):
+    return f"processing_tasks/{task_id}.cancel"
+
+
+class JobContext:
+    """Handle a running job uses to cooperate with cancellation"""
+
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self.cancel_event = threading.Event()
+        self._processes = []
+        self._lock = threading.Lock()
+
+    @property
+    def canceled(self):
+        return self.cancel_event.is_set()
+
+    def check(self):
+        """Raise JobCanceled if the job has been canceled"""
+        if self.canceled:
+            raise JobCanceled(self.task_id)
+
+    def sleep(self, seconds):
+        """Sleep that wakes up (and raises) as soon as the job is canceled"""
+        if self.cancel_event.wait(seconds):
+            raise JobCanceled(self.task_id)
+
+    def popen(self, args, **kwargs):
+        """Start a subprocess that is killed if the job is canceled"""
+        self.check()
+        process = subprocess.Popen(args, **kwargs)
+        with self._lock:
+            self._processes.append(process)
+        if self.canceled:
+            self._terminate(process)
+            raise JobCanceled(self.task_id)
+        return process
+
+    def run(self, args, timeout=None, **kwargs):
+        """subprocess.run() equivalent that honors cancellation"""
+        process = self.popen(args, **kwargs)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        finally:
+            with self._lock:
+                if process in self._processes:
+                    self._processes.remove(process)
+        self.check()
+        if process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, args, stdout, stderr)
+        return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+
+    def _terminate(self, process):
+        if process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=getattr(settings, 'CANCEL_GRACE_SECONDS', 2.0))
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def cancel(self):
+        """Signal the job and kill its subprocesses"""
+        self.cancel_event.set()
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            self._terminate(process)
+
+
+class JobRunner:
+    """
+    Per-process pool of render worker slots fed by a FairShareQueue.
+    Queue positions and expected start times are published to storage so
+    status requests served by other workers can report them.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or getattr(settings, 'RENDER_WORKERS', 2)
+        self._queue = FairShareQueue()
+        self._jobs = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._work_available = threading.Condition(self._lock)
+        self._threads = []
+        self._watcher = None
+        self._publish_lock = threading.Lock()
+        self._published = False
+
+    def submit(self, task_id, func, *args, on_finish=None, on_start=None,
+               user='anonymous', priority='normal', cost=None, estimated_seconds=None, group=None):
+        """
+        Queue func(context, *args) for a worker slot. on_start(task_id) is called
+        when it is dispatched and on_finish(task_id, outcome, error) when it ends,
+        with outcome 'completed', 'canceled' or 'failed'.
+        `cost` (e.g. video duration) orders jobs; `estimated_seconds` feeds start-time estimates.
+        Jobs sharing a `group` (a batch) count once against the per-user cap.
+        """
+        default_cost = getattr(settings, 'RENDER_DEFAULT_COST_SECONDS', 60.0)
+        job = QueuedJob(
+            task_id=task_id,
+            user=user or 'anonymous',
+            priority=priority_rank(priority),
+            cost=float(cost or default_cost),
+            estimated_seconds=float(estimated_seconds or cost or default_cost),
+            group=group,
+            payload=(JobContext(task_id), func, args, on_start, on_finish),
+        )
+        future = Future()
+        with self._lock:
+            self._jobs[task_id] = job.payload[0]
+            self._futures[task_id] = future
+            self._queue.push(job)
+            self._ensure_threads()
+            self._work_available.notify()
+        self._ensure_watcher()
+        self.publish_queue()
+        return future
+
+    def _ensure_threads(self):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(target=self._worker, daemon=True,
+                                      name=f'render-{len(self._threads)}')
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                job = self._queue.pop()
+                while job is None:
+                    self._work_available.wait()
+                    job = self._queue.pop()
+            context, func, args, on_start, on_finish = job.payload
+            self.publish_queue()
+            outcome = self._run(context, func, args, on_start, on_finish)
+            with self._lock:
+                self._queue.finished(job.task_id)
+                future = self._futures.pop(job.task_id, None)
+                # A finished job may lift its user's concurrency cap
+                self._work_available.notify_all()
+            self.publish_queue()
+            if future:
+                future.set_result(outcome)
+
+    def _run(self, context, func, args, on_start, on_finish):
+        outcome, error = 'completed', None
+        try:
+            context.check()
+            if on_start:
+                on_start(context.task_id)
+            with span('render.job'):
+                func(context, *args)
+        except JobCanceled:
+            outcome = 'canceled'
+        except Exception as e:
+            outcome, error = 'failed', str(e)
+            logger.exception("Render job failed", extra={'task_id': context.task_id})
+        finally:
+            with self._lock:
+                self._jobs.pop(context.task_id, None)
+        if on_finish:
+            on_finish(context.task_id, outcome, error)
+        if outcome == 'canceled':
+            clear_cancel_request(context.task_id)
+        return outcome
+
+    def is_running(self, task_id):
+        with self._lock:
+            return task_id in self._jobs
+
+    def cancel(self, task_id):
+        """Cancel a job owned by this process; returns False if it is not here"""
+        with self._lock:
+            context = self._jobs.get(task_id)
+            queued = self._queue.remove(task_id)
+            if queued:
+                self._jobs.pop(task_id, None)
+                future = self._futures.pop(task_id, None)
+        if not context:
+            return False
+        logger.info("Canceling render job", extra={'task_id': task_id, 'queued': bool(queued)})
+        context.cancel()
+        if queued:
+            # Never started, so nothing to kill: just report it
+            _, _, _, _, on_finish = queued.payload
+            if on_finish:
+                on_finish(task_id, 'canceled', None)
+            clear_cancel_request(task_id)
+            self.publish_queue()
+            if future:
+                future.set_result('canceled')
+        return True
+
+    def queue_forecast(self):
+        with self._lock:
+            return self._queue.forecast(self.max_workers)
+
+    def publish_queue(self):
+        """
+        Write this process's queue forecast where any worker can read it,
+        and its queued/running counts to the metrics gauges
+        """
+        # Serialized so an older forecast cannot overwrite a newer one
+        with self._publish_lock:
+            with self._lock:
+                forecast = self._queue.forecast(self.max_workers)
+                queue_depth.set(len(self._queue))
+                active_tasks.set(self._queue.running)
+            registry.flush(force=True)
+            try:
+                write_process_file(render_queue_dir(), forecast)
+                self._published = True
+            except Exception as e:
+                logger.warning("Error publishing render queue", extra={'error': str(e)})
+
+    def owner_id(self):
+        """
+        Id of this process to store on the jobs it will run, so other workers
+        can tell when it is gone (see owner_alive); None if it cannot publish
+        """
+        if not self._published:
+            self.publish_queue()
+        return process_id() if self._published else None
+
+    def _ensure_watcher(self):
+        with self._lock:
+            if self._watcher and self._watcher.is_alive():
+                return
+            self._watcher = threading.Thread(target=self._watch_cancel_requests, daemon=True,
+                                             name='render-cancel-watcher')
+            self._watcher.start()
+
+    def _watch_cancel_requests(self):
+        """Pick up cancels that were requested through another worker process"""
+        interval = getattr(settings, 'CANCEL_POLL_INTERVAL', 0.5)
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                task_ids = [task_id for task_id, context in self._jobs.items() if not context.canceled]
+            for task_id in task_ids:
+                try:
+                    if default_storage.exists(cancel_marker_path(task_id)):
+                        self.cancel(task_id)
+                except Exception as e:
+                    logger.warning("Error checking cancel marker", extra={'task_id': task_id, 'error': str(e)})
+
+
+def render_queue_dir():
+    return getattr(settings, 'RENDER_QUEUE_DIR', None) or os.path.join(tempfile.gettempdir(), 'zuckky_render_queue')
+
+
+def queue_position(task_id):
+    """
+    Queue position and expected start time of a queued task, looked up in
+    the forecasts published by every live worker process; None if not queued
+    """
+    for forecast in read_process_files(render_queue_dir()):
+        entry = forecast.get(task_id)
+        if entry:
+            return entry
+    return None
+
+
+def owner_alive(owner):
+    """Whether the process a JobRunner.owner_id() came from is still running"""
+    return process_alive(render_queue_dir(), owner)
+
+
+def request_cancel(task_id):
+    """Leave a cancel marker for whichever process is running the job"""
+    path = cancel_marker_path(task_id)
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(str(time.time())))
+
+
+def clear_cancel_request(task_id):
+    path = cancel_marker_path(task_id)
+    try:
+        if default_storage.exists(path):
+            default_storage.delete(path)
+    except Exception as e:
+        logger.warning("Error removing cancel marker", extra={'task_id': task_id, 'error': str(e)})
+
+
+_runner = None
+_runner_pid = None
+_runner_lock = threading.Lock()
+
+def get_job_runner():
+    """Process-wide JobRunner; recreated after fork since threads do not survive it"""
+    global _runner, _runner_pid
+    with _runner_lock:
+        if _runner is None or _runner_pid != os.getpid():
+            _runner = JobRunner()
+            _runner_pid = os.getpid()
+        return _runner
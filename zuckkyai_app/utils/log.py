@@ -0,0 +1,147 @@
+"""
+Structured, non-blocking logging.
+
+Request threads only enqueue records on a bounded queue; a background
+QueueListener formats them as JSON lines and writes them out. When the
+queue is full records are dropped (and counted) instead of blocking the
+request. Wired up through settings.LOGGING.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def truncate(value, max_length):
+    """Shorten long strings, noting how much was cut"""
+    if isinstance(value, str) and max_length and len(value) > max_length:
+        return f"{value[:max_length]}...[{len(value) - max_length} more chars]"
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """Render records as one JSON object per line, including `extra` fields"""
+
+    def format(self, record):
+        payload = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_text:
+            payload['exc'] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a `rate` fraction of records below WARNING"""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler with a bounded queue and a lazily started listener thread.
+    A forked child (a gunicorn worker) starts over with its own queue, lock
+    and listener: the parent's may hold records the parent still writes,
+    or be locked by a thread that does not exist in the child.
+    """
+
+    def __init__(self, queue_size=10000, max_length=2000, stream=None):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.queue_size = queue_size
+        self.max_length = max_length
+        self.stream = stream
+        self.dropped = 0
+        self._listener = None
+        self._listener_pid = None
+        self._start_lock = threading.Lock()
+        self._pid = os.getpid()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        self.queue = queue.Queue(maxsize=self.queue_size)
+        self.dropped = 0
+        self._listener = None
+        self._listener_pid = None
+        self._start_lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _ensure_listener(self):
+        if self._listener_pid == os.getpid():
+            return
+        if self._pid != os.getpid():
+            # Forked without the at-fork hook having run
+            self._reset_after_fork()
+        with self._start_lock:
+            if self._listener_pid == os.getpid():
+                return
+            target = logging.StreamHandler(self.stream or sys.stdout)
+            target.setFormatter(self.formatter or JsonFormatter())
+            self._listener = logging.handlers.QueueListener(self.queue, target, respect_handler_level=False)
+            self._listener.start()
+            self._listener_pid = os.getpid()
+            atexit.register(self._stop_listener, self._listener, self._listener_pid)
+
+    @staticmethod
+    def _stop_listener(listener, pid):
+        # Children inherit the exit hook of a listener that only ran in the parent
+        if os.getpid() == pid:
+            listener.stop()
+
+    def prepare(self, record):
+        """
+        Make the record safe to hand to another thread without formatting it:
+        merge args, render tracebacks and truncate large fields.
+        """
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = truncate(record.getMessage(), self.max_length)
+        record.args = None
+        if record.exc_info:
+            record.exc_text = truncate(logging.Formatter().formatException(record.exc_info), self.max_length * 4)
+            record.exc_info = None
+        for key, value in list(record.__dict__.items()):
+            if key not in _RESERVED_ATTRS:
+                setattr(record, key, truncate(value, self.max_length))
+        if self.dropped:
+            record.dropped_before = self.dropped
+            self.dropped = 0
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Keep the count this record was carrying for the next one
+            self.dropped += 1 + getattr(record, 'dropped_before', 0)
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def flush(self):
+        """Block until queued records have been written (used on shutdown and in tools)"""
+        deadline = time.monotonic() + 5
+        while not self.queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
@@ -0,0 +1,192 @@
+"""
+Helpers for inspecting stored media files with ffprobe, plus a content-
+addressed cache for analysis results and the worker-process runner the
+ffmpeg-based analyses share.
+
+ffprobe is optional: when it is not installed (or the storage backend has
+no local paths) probes fall back to what the storage itself can report.
+"""
+import hashlib
+import json
+import logging
+import shutil
+import subprocess
+import sys
+import threading
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .metrics import record_cache, span
+from .storage import write_json
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+_hash_locks = {}
+_hash_locks_lock = threading.Lock()
+
+
+def local_path(storage_path):
+    """Filesystem path for a stored file, or None for remote storage backends"""
+    try:
+        return default_storage.path(storage_path)
+    except NotImplementedError:
+        return None
+
+
+def probe_video(storage_path):
+    """
+    Return basic facts about a stored video: size in bytes and, when ffprobe
+    is available, duration in seconds, dimensions and frame rate.
+    """
+    info = {'path': storage_path, 'size': None, 'duration': None,
+            'width': None, 'height': None, 'fps': None, 'has_audio': None}
+    try:
+        info['size'] = default_storage.size(storage_path)
+    except (OSError, NotImplementedError):
+        pass
+
+    path = local_path(storage_path)
+    ffprobe = shutil.which('ffprobe')
+    if not path or not ffprobe:
+        return info
+
+    try:
+        with span('media.probe'):
+            result = subprocess.run(
+                [ffprobe, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+                capture_output=True, text=True, timeout=30, check=True,
+            )
+        data = json.loads(result.stdout)
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        logger.warning("ffprobe failed", extra={'path': storage_path, 'error': str(e)})
+        return info
+
+    duration = data.get('format', {}).get('duration')
+    info['duration'] = float(duration) if duration else None
+    streams = data.get('streams', [])
+    info['has_audio'] = any(s.get('codec_type') == 'audio' for s in streams)
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    if video:
+        info['width'] = video.get('width')
+        info['height'] = video.get('height')
+        rate = video.get('avg_frame_rate') or video.get('r_frame_rate') or '0/0'
+        num, _, den = rate.partition('/')
+        if den and float(den):
+            info['fps'] = float(num) / float(den)
+    return info
+
+
+def _file_stamp(storage_path):
+    """(size, modified time) of a stored file, or None if the backend cannot tell"""
+    try:
+        return [default_storage.size(storage_path), default_storage.get_modified_time(storage_path).timestamp()]
+    except (OSError, NotImplementedError):
+        return None
+
+
+def _hash_lock(storage_path):
+    with _hash_locks_lock:
+        return _hash_locks.setdefault(storage_path, threading.Lock())
+
+
+def content_hash(storage_path, context=None):
+    """
+    BLAKE2b digest of a stored file's bytes, read in 1 MB chunks.
+    The digest is remembered in analysis_cache/hashes/ against the file's
+    size and modified time, and concurrent callers in a process wait for the
+    one hashing, so an upload is read once however many stages and batch
+    variants analyze it. With a JobContext, a cancel stops hashing (or
+    waiting) at the next chunk.
+    """
+    record_path = f"analysis_cache/hashes/{hashlib.blake2b(storage_path.encode(), digest_size=16).hexdigest()}.json"
+    lock = _hash_lock(storage_path)
+    while not lock.acquire(timeout=0.2):
+        if context:
+            context.check()
+    try:
+        stamp = _file_stamp(storage_path)
+        if stamp:
+            try:
+                if default_storage.exists(record_path):
+                    with default_storage.open(record_path, 'r') as f:
+                        record = json.load(f)
+                    if record.get('path') == storage_path and record.get('stamp') == stamp:
+                        record_cache('hashes', True)
+                        return record['hash']
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable hash record", extra={'path': record_path, 'error': str(e)})
+        record_cache('hashes', False)
+
+        digest = hashlib.blake2b(digest_size=20)
+        with span('media.hash'):
+            with default_storage.open(storage_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                    if context:
+                        context.check()
+                    digest.update(chunk)
+        result = digest.hexdigest()
+        if stamp:
+            try:
+                write_json(record_path, {'path': storage_path, 'stamp': stamp, 'hash': result})
+            except Exception as e:
+                logger.warning("Error saving hash record", extra={'path': record_path, 'error': str(e)})
+        return result
+    finally:
+        lock.release()
+
+
+def cached_analysis(kind, key, compute):
+    """
+    Return the cached result for analysis_cache/<kind>/<key>.json, or run
+    compute() and cache what it returns. `key` should include the content
+    hash and anything else that changes the result.
+    """
+    storage_path = f"analysis_cache/{kind}/{key}.json"
+    try:
+        if default_storage.exists(storage_path):
+            with default_storage.open(storage_path, 'r') as f:
+                result = json.load(f)
+            record_cache(kind, True)
+            return result
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable analysis cache entry", extra={'path': storage_path, 'error': str(e)})
+
+    record_cache(kind, False)
+    result = compute()
+    try:
+        write_json(storage_path, result)
+    except Exception as e:
+        logger.warning("Error caching analysis result", extra={'path': storage_path, 'error': str(e)})
+    return result
+
+
+def worker_analysis(kind, module, storage_path, key_suffix, context=None):
+    """
+    Run `python -m <module> <local path>` in a worker process and return the
+    JSON it prints, cached under analysis_cache/<kind>/ by content hash plus
+    `key_suffix` (algorithm version and settings). The worker stays off the
+    web process's CPU and, with a JobContext, is killed if the job is
+    canceled. ffmpeg and a local path are checked before the file is hashed.
+    """
+    path = local_path(storage_path)
+    if not path:
+        raise RuntimeError('storage has no local paths')
+    if not shutil.which('ffmpeg'):
+        raise RuntimeError('ffmpeg is not installed')
+
+    def compute():
+        args = [sys.executable, '-m', module, path]
+        with span(f'analysis.{kind}'):
+            if context:
+                result = context.run(args, cwd=settings.BASE_DIR, stdout=subprocess.PIPE,
+                                     stderr=subprocess.PIPE, text=True)
+            else:
+                result = subprocess.run(args, cwd=settings.BASE_DIR, stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE, text=True, check=True)
+        return json.loads(result.stdout)
+
+    key = f"{content_hash(storage_path, context)}-{key_suffix}"
+    return cached_analysis(kind, key, compute)
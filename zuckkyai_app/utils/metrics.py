@@ -0,0 +1,302 @@
+"""
+Lightweight Prometheus-style metrics shared across gunicorn workers.
+
+Each worker keeps its counters, gauges and histograms in memory and
+periodically snapshots them to a per-process file in METRICS_DIR (see
+runtime.py). The /metrics view merges the snapshots of every live worker,
+so the exposition covers all workers regardless of which one answers the
+scrape. When a worker exits, its counters and histograms are folded into
+an accumulated snapshot in the same directory (as prometheus_client's
+multiprocess mode keeps dead workers' files), so totals never go
+backwards and Prometheus does not see a counter reset. Gauges describe
+live state and are dropped with their worker.
+"""
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .runtime import directory_lock, read_process_files, write_json_atomic, write_process_file
+
+ACCUMULATED_FILE = 'accumulated.json'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+THROUGHPUT_BUCKETS = (1e5, 5e5, 1e6, 5e6, 1e7, 5e7, 1e8, 5e8, 1e9)
+
+logger = logging.getLogger(__name__)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(label_items, extra=()):
+    items = list(label_items) + list(extra)
+    if not items:
+        return ''
+    rendered = ','.join(f'{k}="{_escape(v)}"' for k, v in items)
+    return '{' + rendered + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(map(list, key)), value] for key, value in self._values.items()]
+
+    @staticmethod
+    def merge(snapshots):
+        merged = {}
+        for snapshot in snapshots:
+            for key, value in snapshot:
+                key = tuple(map(tuple, key))
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def render(self, merged):
+        lines = []
+        for key, value in sorted(merged.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Gauge set by each worker; the exposition sums the live workers' values"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(map(list, key)), value] for key, value in self._values.items()]
+
+    @staticmethod
+    def merge(snapshots):
+        return Counter.merge(snapshots)
+
+    def render(self, merged):
+        return Counter.render(self, merged)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(map(list, key)), [list(counts), total, count]]
+                    for key, (counts, total, count) in self._values.items()]
+
+    def merge(self, snapshots):
+        merged = {}
+        for snapshot in snapshots:
+            for key, (counts, total, count) in snapshot:
+                key = tuple(map(tuple, key))
+                entry = merged.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += count
+        return merged
+
+    def render(self, merged):
+        lines = []
+        for key, (counts, total, count) in sorted(merged.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = (('le', _format_value(float(bound))),)
+                lines.append(f"{self.name}_bucket{_format_labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(float(total))}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+        self._exit_flush_pid = None
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    @property
+    def directory(self):
+        return getattr(settings, 'METRICS_DIR', None) or os.path.join(tempfile.gettempdir(), 'zuckky_metrics')
+
+    def flush(self, force=False):
+        """Write this worker's snapshot, at most once per METRICS_FLUSH_INTERVAL"""
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0)
+        now = time.monotonic()
+        if not force and now - self._last_flush < interval:
+            return
+        # Forced flushes wait their turn so the latest values are what gets written
+        if not self._flush_lock.acquire(blocking=force):
+            return
+        try:
+            self._last_flush = now
+            snapshot = {name: metric.snapshot() for name, metric in self._metrics.items()}
+            write_process_file(self.directory, snapshot, retire=self._retire)
+            if self._exit_flush_pid != os.getpid():
+                # Runs before runtime's exit hook (atexit is LIFO), which retires what this writes
+                self._exit_flush_pid = os.getpid()
+                atexit.register(self._flush_at_exit, os.getpid())
+        except OSError as e:
+            logger.warning("Error writing metrics snapshot", extra={'error': str(e)})
+        finally:
+            self._flush_lock.release()
+
+    def _flush_at_exit(self, pid):
+        if os.getpid() == pid:
+            self.flush(force=True)
+
+    def _load_accumulated(self):
+        try:
+            with open(os.path.join(self.directory, ACCUMULATED_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _retire(self, snapshot):
+        """Fold an exited worker's counters and histograms into the accumulated snapshot"""
+        accumulated = self._load_accumulated()
+        for name, metric in self._metrics.items():
+            if metric.kind == 'gauge' or name not in snapshot:
+                continue
+            merged = metric.merge([accumulated.get(name, []), snapshot[name]])
+            accumulated[name] = [[list(map(list, key)), value] for key, value in merged.items()]
+        write_json_atomic(self.directory, os.path.join(self.directory, ACCUMULATED_FILE), accumulated)
+
+    def _load_snapshots(self):
+        """Live workers' snapshots, and the accumulated one of exited workers"""
+        # Locked so a worker retired mid-read is counted exactly once
+        with directory_lock(self.directory):
+            return read_process_files(self.directory, retire=self._retire), self._load_accumulated()
+
+    def render(self):
+        """Prometheus text exposition merged across all workers"""
+        self.flush(force=True)
+        snapshots, accumulated = self._load_snapshots()
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            parts = [s.get(name, []) for s in snapshots]
+            if metric.kind != 'gauge':
+                parts.append(accumulated.get(name, []))
+            merged = metric.merge(parts)
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render(merged))
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.register(Histogram(
+    'zuckky_http_request_duration_seconds', 'Time spent serving HTTP requests'))
+http_requests = registry.register(Counter(
+    'zuckky_http_requests_total', 'HTTP requests served'))
+span_duration = registry.register(Histogram(
+    'zuckky_span_duration_seconds', 'Time spent in instrumented hot-path spans'))
+span_errors = registry.register(Counter(
+    'zuckky_span_errors_total', 'Instrumented spans that raised'))
+upload_bytes = registry.register(Counter(
+    'zuckky_upload_bytes_total', 'Bytes received through video uploads'))
+upload_throughput = registry.register(Histogram(
+    'zuckky_upload_bytes_per_second', 'Upload streaming throughput', buckets=THROUGHPUT_BUCKETS))
+cache_requests = registry.register(Counter(
+    'zuckky_cache_requests_total', 'Cache lookups by cache and result (hit or miss)'))
+
+
+active_tasks = registry.register(Gauge(
+    'zuckky_active_tasks', 'Render jobs running in a local worker slot'))
+queue_depth = registry.register(Gauge(
+    'zuckky_queue_depth', 'Render jobs waiting for a local worker slot'))
+
+
+@contextmanager
+def span(name):
+    """Time a block of hot-path work under zuckky_span_duration_seconds{span=name}"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        span_errors.inc(span=name)
+        raise
+    finally:
+        span_duration.observe(time.perf_counter() - started, span=name)
+
+
+def record_cache(cache, hit):
+    cache_requests.inc(cache=cache, result='hit' if hit else 'miss')
@@ -0,0 +1,225 @@
+"""
+Per-process runtime files shared between gunicorn workers.
+
+Each worker publishes a small JSON document (metrics snapshot, render
+queue forecast) to a directory every worker reads. Files are named
+<pid>-<token>.json, where the token is picked per process, and replaced
+atomically. A process removes its own files at exit, and on its first
+write removes those of an earlier process that had its pid. Readers
+delete the files of processes that died without cleaning up. Since
+<pid>-<token> names one process for its lifetime, records can store it
+(process_id()) and later ask whether that process is still up.
+
+A `retire` callback lets a directory keep something from the files it
+loses: it is called with a file's data just before the file is removed,
+under directory_lock(), so each file is retired exactly once.
+"""
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import nullcontext
+
+try:
+    import fcntl
+except ImportError:  # Windows development servers run a single process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_token = None
+_token_pid = None
+_registered = set()
+_directory_locks = {}
+_lock = threading.Lock()
+
+
+def _process_token():
+    """Random per-process token, renewed after fork"""
+    global _token, _token_pid
+    with _lock:
+        if _token_pid != os.getpid():
+            _token = uuid.uuid4().hex[:8]
+            _token_pid = os.getpid()
+            _registered.clear()
+            _directory_locks.clear()
+        return _token
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def process_id():
+    """<pid>-<token> of this process, unique even across pid reuse"""
+    return f'{os.getpid()}-{_process_token()}'
+
+
+def process_file(directory):
+    return os.path.join(directory, f'{process_id()}.json')
+
+
+def process_alive(directory, owner):
+    """Whether the process `owner` (a process_id()) still has its file in `directory`"""
+    pid, _, token = owner.partition('-')
+    if not pid.isdigit():
+        return False
+    if int(pid) == os.getpid():
+        return token == _process_token()
+    return _pid_alive(int(pid)) and os.path.exists(os.path.join(directory, f'{owner}.json'))
+
+
+class _DirectoryLock:
+    """Reentrant lock held across processes through flock() on <directory>/.lock"""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, '.lock')
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            # Closing the descriptor releases the flock
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
+
+
+def directory_lock(directory):
+    """Exclusive lock on `directory`, shared by the threads and processes using it"""
+    _process_token()
+    with _lock:
+        lock = _directory_locks.get(directory)
+        if lock is None:
+            lock = _directory_locks[directory] = _DirectoryLock(directory)
+        return lock
+
+
+def write_json_atomic(directory, path, data):
+    """Replace `path` (inside `directory`) with `data` as JSON, atomically"""
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _retire_file(directory, path, retire):
+    """Remove a process file, handing its data to `retire` first"""
+    with directory_lock(directory) if retire else nullcontext():
+        if retire:
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                # Retired by someone else already
+                return
+            except (OSError, ValueError):
+                data = None
+            if data is not None:
+                try:
+                    retire(data)
+                except Exception as e:
+                    # Keep the file so a later reader can retry
+                    logger.warning("Error retiring runtime file", extra={'path': path, 'error': str(e)})
+                    return
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _remove_predecessors(directory, retire=None):
+    """Retire files left by an earlier process with our pid"""
+    own = os.path.basename(process_file(directory))
+    prefix = f'{os.getpid()}-'
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(prefix) and name.endswith('.json') and name != own:
+            _retire_file(directory, os.path.join(directory, name), retire)
+
+
+def write_process_file(directory, data, retire=None):
+    """Replace this process's file in `directory` with `data`"""
+    write_json_atomic(directory, process_file(directory), data)
+    with _lock:
+        first_write = directory not in _registered
+        _registered.add(directory)
+    if first_write:
+        _remove_predecessors(directory, retire)
+        atexit.register(_remove_at_exit, directory, retire, os.getpid())
+
+
+def remove_process_file(directory, retire=None):
+    _retire_file(directory, process_file(directory), retire)
+
+
+def _remove_at_exit(directory, retire, pid):
+    # Forked children inherit the parent's exit hooks; only the writer cleans up
+    if os.getpid() == pid:
+        remove_process_file(directory, retire)
+
+
+def read_process_files(directory, retire=None):
+    """Data published by every live process in `directory`, retiring stale files"""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    own_pid, own_token = os.getpid(), _process_token()
+    results = []
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        pid, _, token = name[:-len('.json')].partition('-')
+        if not pid.isdigit():
+            continue
+        pid = int(pid)
+        path = os.path.join(directory, name)
+        if (pid == own_pid and token != own_token) or not _pid_alive(pid):
+            _retire_file(directory, path, retire)
+            continue
+        try:
+            with open(path) as f:
+                results.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return results
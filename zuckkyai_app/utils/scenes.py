@@ -0,0 +1,142 @@
+"""
+Shot-boundary detection for transition-heavy presets (cinematic).
+
+ffmpeg streams tiny grayscale frames (FRAME_WIDTH x FRAME_HEIGHT) and the
+detector scores batches of frames at once with NumPy: the L1 distance
+between consecutive luma histograms plus the mean absolute pixel change.
+A cut is declared where both exceed their thresholds, at least
+MIN_SHOT_SECONDS after the previous one.
+
+detect_scenes() runs this module as a separate worker process
+(`python -m zuckkyai_app.utils.scenes <path>`) so the CPU work stays off
+the web worker and is killed with the job on cancel. Results are cached
+by content hash, so re-renders of the same video skip detection.
+"""
+import json
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+
+FRAME_WIDTH = 64
+FRAME_HEIGHT = 36
+ANALYSIS_FPS = 10
+BATCH_FRAMES = 256
+HISTOGRAM_BINS = 16
+HISTOGRAM_THRESHOLD = 0.4   # L1 histogram distance, 0 (same) to 1 (disjoint)
+PIXEL_THRESHOLD = 20.0      # mean absolute luma change, 0-255
+MIN_SHOT_SECONDS = 0.5
+
+# Bump when the algorithm or its defaults change, to invalidate cached results
+DETECTOR_VERSION = 1
+
+
+def luma_histograms(frames):
+    """Normalized HISTOGRAM_BINS-bin histograms for a (n, h, w) uint8 batch"""
+    count = frames.shape[0]
+    bins = (frames.reshape(count, -1) >> (8 - int(np.log2(HISTOGRAM_BINS)))).astype(np.intp)
+    # Offset each frame's bins so one bincount covers the whole batch
+    bins += np.arange(count, dtype=np.intp)[:, None] * HISTOGRAM_BINS
+    histograms = np.bincount(bins.ravel(), minlength=count * HISTOGRAM_BINS).reshape(count, HISTOGRAM_BINS)
+    return histograms / float(frames.shape[1] * frames.shape[2])
+
+
+def score_batch(frames, previous=None):
+    """
+    Change scores between each frame and the one before it.
+    `previous` is the last frame of the prior batch (None for the first batch,
+    whose first frame then scores zero). Returns (histogram, pixel) arrays.
+    """
+    if previous is not None:
+        frames = np.concatenate((previous[None], frames))
+    histograms = luma_histograms(frames)
+    hist_scores = np.abs(np.diff(histograms, axis=0)).sum(axis=1) / 2
+    pixel_scores = np.abs(np.diff(frames.astype(np.int16), axis=0)).mean(axis=(1, 2))
+    if previous is None:
+        hist_scores = np.concatenate(([0.0], hist_scores))
+        pixel_scores = np.concatenate(([0.0], pixel_scores))
+    return hist_scores, pixel_scores
+
+
+def stream_frames(path, fps=ANALYSIS_FPS):
+    """Yield (n, FRAME_HEIGHT, FRAME_WIDTH) uint8 batches decoded by ffmpeg"""
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        raise RuntimeError('ffmpeg is not installed')
+    args = [ffmpeg, '-nostdin', '-v', 'error', '-i', path, '-an',
+            '-vf', f'fps={fps},scale={FRAME_WIDTH}:{FRAME_HEIGHT},format=gray',
+            '-f', 'rawvideo', '-pix_fmt', 'gray', '-']
+    frame_bytes = FRAME_WIDTH * FRAME_HEIGHT
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            data = process.stdout.read(frame_bytes * BATCH_FRAMES)
+            count = len(data) // frame_bytes
+            if not count:
+                break
+            yield np.frombuffer(data[:count * frame_bytes], dtype=np.uint8).reshape(count, FRAME_HEIGHT, FRAME_WIDTH)
+    finally:
+        process.stdout.close()
+        process.wait()
+    if process.returncode:
+        raise RuntimeError(f'ffmpeg exited with status {process.returncode}')
+
+
+class BoundaryTracker:
+    """
+    Accumulates shot boundaries from consecutive frame batches, carrying the
+    last frame and the last cut across batch edges
+    """
+
+    def __init__(self, fps=ANALYSIS_FPS):
+        self.fps = fps
+        self.boundaries = []
+        self.frames = 0
+        self._previous = None
+        self._min_gap = int(round(MIN_SHOT_SECONDS * fps))
+        self._last_cut = -self._min_gap
+
+    def add(self, frames):
+        """Score a (n, h, w) uint8 luma batch and record any cuts in it"""
+        hist_scores, pixel_scores = score_batch(frames, self._previous)
+        candidates = np.flatnonzero((hist_scores > HISTOGRAM_THRESHOLD) & (pixel_scores > PIXEL_THRESHOLD)) + self.frames
+        for index in candidates:
+            if index - self._last_cut >= self._min_gap:
+                self.boundaries.append(round(float(index) / self.fps, 3))
+                self._last_cut = index
+        self._previous = frames[-1]
+        self.frames += frames.shape[0]
+
+    @property
+    def duration(self):
+        return round(self.frames / self.fps, 3)
+
+
+def find_boundaries(path, fps=ANALYSIS_FPS):
+    """Shot boundaries (seconds) and total analyzed duration for a local video file"""
+    tracker = BoundaryTracker(fps)
+    for frames in stream_frames(path, fps):
+        tracker.add(frames)
+    return tracker.boundaries, tracker.duration
+
+
+def detect_scenes(storage_path, context=None):
+    """
+    Shot boundaries for a stored video, computed in a worker process and
+    cached by content hash. Returns {'boundaries', 'shots', 'duration'}.
+    """
+    # Django-dependent imports stay local so the worker process only needs NumPy
+    from .media import worker_analysis
+    return worker_analysis('scenes', __name__, storage_path, f"v{DETECTOR_VERSION}-{ANALYSIS_FPS}fps", context)
+
+
+def main(argv):
+    boundaries, duration = find_boundaries(argv[1])
+    edges = [0.0] + boundaries + [duration]
+    shots = [{'start': start, 'end': end} for start, end in zip(edges, edges[1:]) if end > start]
+    json.dump({'boundaries': boundaries, 'shots': shots, 'duration': duration}, sys.stdout)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
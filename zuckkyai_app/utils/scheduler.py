@@ -0,0 +1,173 @@
+"""
+Fair-share ordering for queued render jobs.
+
+Ordering rules, in this order:
+  1. priority class (RENDER_PRIORITIES, lower rank runs first)
+  2. weighted fair queuing across users: each user has a virtual clock
+     that advances by cost / weight for every job dispatched, so a user
+     with ten long videos does not starve a user with one
+  3. shortest job first within a user, using the probed video duration
+     (estimated from the file size when it could not be probed)
+Users at their RENDER_MAX_JOBS_PER_USER concurrency cap are skipped. The
+variants of a batch count as one unit against that cap, and run up to
+BATCH_MAX_PARALLEL at a time, so a batch is not serialized behind itself.
+
+FairShareQueue is not thread-safe; JobRunner guards it with its lock.
+"""
+import itertools
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+DEFAULT_PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+
+def priority_rank(priority):
+    priorities = getattr(settings, 'RENDER_PRIORITIES', DEFAULT_PRIORITIES)
+    if priority not in priorities:
+        raise ValueError(f"Unknown priority '{priority}', expected one of: {', '.join(priorities)}")
+    return priorities[priority]
+
+
+@dataclass
+class QueuedJob:
+    task_id: str
+    user: str
+    priority: int
+    cost: float                # ordering weight, e.g. probed duration in seconds
+    estimated_seconds: float   # expected run time, used for start-time estimates
+    group: str = None          # batch group id; a group counts once against the per-user cap
+    payload: object = None
+    seq: int = 0
+    enqueued_at: float = field(default_factory=time.time)
+
+
+class FairShareQueue:
+    def __init__(self, max_per_user=None, user_weights=None, max_per_group=None):
+        self.max_per_user = max_per_user or getattr(settings, 'RENDER_MAX_JOBS_PER_USER', 1)
+        self.user_weights = user_weights if user_weights is not None else getattr(settings, 'RENDER_USER_WEIGHTS', {})
+        self.max_per_group = max_per_group or getattr(settings, 'BATCH_MAX_PARALLEL', 4)
+        self._jobs = {}
+        self._running = {}        # task_id -> (user, group, started_at, estimated_seconds)
+        self._user_clock = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __contains__(self, task_id):
+        return task_id in self._jobs
+
+    def push(self, job):
+        job.seq = next(self._seq)
+        self._jobs[job.task_id] = job
+
+    def remove(self, task_id):
+        return self._jobs.pop(task_id, None)
+
+    def _weight(self, user):
+        return max(float(self.user_weights.get(user, 1.0)), 1e-6)
+
+    def _running_units(self, running):
+        """
+        Running units per user (a batch group is one unit however many of its
+        variants run) and running jobs per group
+        """
+        units, groups = {}, {}
+        for task_id, (user, group, _, _) in running.items():
+            units.setdefault(user, set()).add(group or task_id)
+            if group:
+                groups[group] = groups.get(group, 0) + 1
+        return {user: len(keys) for user, keys in units.items()}, groups, units
+
+    def _dispatchable(self, job, running):
+        user_units, group_counts, units = running
+        if job.group and job.group in units.get(job.user, ()):
+            # Its group already holds one of the user's units
+            return group_counts[job.group] < self.max_per_group
+        return user_units.get(job.user, 0) < self.max_per_user
+
+    def _select(self, jobs, running, user_clock, virtual_time):
+        """Pick the next job to dispatch; returns (job, virtual start, virtual finish)"""
+        running = self._running_units(running)
+        best_per_user = {}
+        for job in jobs:
+            if not self._dispatchable(job, running):
+                continue
+            current = best_per_user.get(job.user)
+            if current is None or (job.priority, job.cost, job.seq) < (current.priority, current.cost, current.seq):
+                best_per_user[job.user] = job
+
+        best = None
+        for user, job in best_per_user.items():
+            start = max(user_clock.get(user, 0.0), virtual_time)
+            finish = start + job.cost / self._weight(user)
+            key = (job.priority, finish, job.seq)
+            if best is None or key < best[0]:
+                best = (key, job, start, finish)
+        if best is None:
+            return None, None, None
+        return best[1], best[2], best[3]
+
+    def pop(self):
+        """Remove and return the next dispatchable job, or None"""
+        job, start, finish = self._select(self._jobs.values(), self._running, self._user_clock, self._virtual_time)
+        if job is None:
+            return None
+        del self._jobs[job.task_id]
+        self._user_clock[job.user] = finish
+        self._virtual_time = start
+        self._running[job.task_id] = (job.user, job.group, time.time(), job.estimated_seconds)
+        return job
+
+    def finished(self, task_id):
+        self._running.pop(task_id, None)
+
+    @property
+    def running(self):
+        """Number of dispatched jobs that have not finished"""
+        return len(self._running)
+
+    def forecast(self, slots):
+        """
+        Simulate dispatch of everything queued on `slots` workers.
+        Returns {task_id: {'queue_position', 'expected_start_at'}}.
+        """
+        now = time.time()
+        running = dict(self._running)
+        # Each slot becomes free when its running job is expected to end
+        free_at = [max(now, started + estimate) for _, _, started, estimate in running.values()]
+        free_at = sorted(free_at + [now] * max(0, slots - len(free_at)))
+        ends = {task_id: max(now, started + estimate) for task_id, (_, _, started, estimate) in running.items()}
+
+        jobs = list(self._jobs.values())
+        user_clock = dict(self._user_clock)
+        virtual_time = self._virtual_time
+        forecast = {}
+        position = 0
+        while jobs:
+            slot_time = free_at.pop(0)
+            # Jobs that will have ended by then no longer count against their user's cap
+            for task_id in [t for t, end in ends.items() if end <= slot_time]:
+                running.pop(task_id, None)
+                del ends[task_id]
+            job, start, finish = self._select(jobs, running, user_clock, virtual_time)
+            if job is None:
+                # Everyone left is capped: wait for the next running job to end
+                if not ends:
+                    break
+                free_at.append(max(slot_time, min(ends.values())))
+                free_at.sort()
+                continue
+            jobs.remove(job)
+            user_clock[job.user] = finish
+            virtual_time = start
+            position += 1
+            forecast[job.task_id] = {'queue_position': position, 'expected_start_at': slot_time}
+            running[job.task_id] = (job.user, job.group, slot_time, job.estimated_seconds)
+            ends[job.task_id] = slot_time + job.estimated_seconds
+            free_at.append(ends[job.task_id])
+            free_at.sort()
+        return forecast
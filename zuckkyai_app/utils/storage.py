@@ -0,0 +1,47 @@
+"""
+JSON records kept in default_storage (task and batch records, analysis
+cache entries).
+
+Records are rewritten while other threads and worker processes read them,
+so on filesystem storage they are replaced atomically: written to a temp
+file in the same directory and moved over the old one with os.replace().
+Readers see either the old or the new record, never a missing or partial
+one, and concurrent writers cannot leave Storage.save()'s renamed copies
+behind.
+"""
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+
+def write_json(storage_path, data):
+    """Replace the JSON record at `storage_path`"""
+    content = json.dumps(data, separators=(',', ':'))
+    try:
+        path = default_storage.path(storage_path)
+    except NotImplementedError:
+        # Backends without local paths get the best they offer: overwrite via delete + save
+        if default_storage.exists(storage_path):
+            default_storage.delete(storage_path)
+        default_storage.save(storage_path, ContentFile(content))
+        return
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        if settings.FILE_UPLOAD_PERMISSIONS is not None:
+            os.chmod(tmp_path, settings.FILE_UPLOAD_PERMISSIONS)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
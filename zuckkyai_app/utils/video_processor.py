@@ -1,9 +1,38 @@
-import requests
+import logging
 import time
 import os
 import json
+import subprocess
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
 from django.core.files.storage import default_storage
+from .audio import AudioUnavailable, analyze_audio
+from .fingerprint import fingerprint_reference, fingerprint_to_parameters
+from .jobs import clear_cancel_request, cancel_marker_path, get_job_runner, owner_alive, queue_position, request_cancel
+from .media import probe_video
+from .metrics import span
+from .scenes import detect_scenes
+from .storage import write_json
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('completed', 'canceled', 'failed', 'error')
+
+MOCK_RENDER_SECONDS = 30
+
+_session = None
+
+def _http_session():
+    """
+    Shared requests session, created on first real API call so the mock
+    path never imports requests (and reuses connections when it does)
+    """
+    global _session
+    if _session is None:
+        import requests
+        _session = requests.Session()
+    return _session
 
 class VideoProcessor:
     def __init__(self):
@@ -12,32 +41,148 @@ class VideoProcessor:
         self.api_key = getattr(settings, 'VIDEO_API_KEY', 'your-api-key-here')
         self.mock_mode = getattr(settings, 'MOCK_VIDEO_PROCESSING', True)  # Use mock for demo
         
-    def start_processing(self, main_video_path, reference_video_path=None, template_style='default', instructions=''):
+    def start_processing(self, main_video_path, reference_video_path=None, template_style='default', instructions='',
+                         prepared_inputs=None, user_id=None, priority='normal', group_id=None):
         """
         Start video processing with the selected parameters
         Returns a task ID that can be used to check status
+        `prepared_inputs` (from prepare_inputs) lets batches share one upload/probe
+        `user_id`, `priority` and `group_id` (the batch) feed the fair-share render queue
         """
         if self.mock_mode:
-            return self._mock_start_processing(main_video_path, reference_video_path, template_style, instructions)
+            return self._mock_start_processing(main_video_path, reference_video_path, template_style, instructions,
+                                               prepared_inputs, user_id, priority, group_id)
+        else:
+            return self._real_start_processing(main_video_path, reference_video_path, template_style, instructions,
+                                               prepared_inputs, user_id, priority, group_id)
+    
+    def prepare_inputs(self, main_video_path, reference_video_path=None):
+        """
+        Probe the input videos and make them reachable by the API, once.
+        The result is shared by every variant of a batch.
+        """
+        return {
+            'main_video_url': self._prepare_video_for_api(main_video_path),
+            'reference_video_url': self._prepare_video_for_api(reference_video_path) if reference_video_path else None,
+            'probe': probe_video(main_video_path),
+        }
+    
+    def validate_variants(self, variants):
+        """
+        Check batch variants before anything is started: a list of dicts with
+        a string 'template_style' and optional string 'instructions'
+        """
+        if not isinstance(variants, list):
+            raise ValueError('variants must be a list')
+        for index, variant in enumerate(variants):
+            if not isinstance(variant, dict):
+                raise ValueError(f'variant {index} must be an object')
+            if not isinstance(variant.get('template_style'), str):
+                raise ValueError(f'variant {index} needs a template_style string')
+            if not isinstance(variant.get('instructions', ''), str):
+                raise ValueError(f'variant {index} instructions must be a string')
+    
+    def start_batch(self, main_video_path, reference_video_path, variants, user_id=None, priority='normal'):
+        """
+        Start one task per variant ({'template_style', 'instructions'}) in parallel,
+        all sharing the same prepared inputs. Returns a group ID.
+        If any variant fails to start, the ones already started are canceled.
+        """
+        self.validate_variants(variants)
+        prepared = self.prepare_inputs(main_video_path, reference_video_path)
+        group_id = f"group_{uuid.uuid4().hex[:12]}"
+        
+        def start_variant(variant):
+            return self.start_processing(
+                main_video_path,
+                reference_video_path,
+                variant.get('template_style', 'default'),
+                variant.get('instructions', ''),
+                prepared_inputs=prepared,
+                user_id=user_id,
+                priority=priority,
+                group_id=group_id
+            )
+        
+        max_parallel = getattr(settings, 'BATCH_MAX_PARALLEL', 4)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(variants)))) as pool:
+            futures = [pool.submit(start_variant, variant) for variant in variants]
+            errors = [future.exception() for future in futures]
+            task_ids = [future.result() for future, error in zip(futures, errors) if error is None]
+            if any(errors):
+                # No group record exists yet, so nothing else could stop these
+                list(pool.map(self.cancel_processing, task_ids))
+                raise next(error for error in errors if error)
+        
+        group_details = {
+            'group_id': group_id,
+            'main_video': main_video_path,
+            'reference_video': reference_video_path,
+            'probe': prepared['probe'],
+            'variants': [dict(variant, task_id=task_id) for variant, task_id in zip(variants, task_ids)],
+            'started_at': time.time()
+        }
+        self._save_record(f"processing_groups/{group_id}.json", group_details)
+        
+        return group_id
+    
+    def get_batch_status(self, group_id):
+        """
+        Aggregate the status of every variant in a batch
+        """
+        group = self._load_record(f"processing_groups/{group_id}.json")
+        if not group:
+            return {'status': 'error', 'progress': 0, 'error': 'Group not found'}
+        
+        variants = group['variants']
+        max_parallel = getattr(settings, 'BATCH_MAX_PARALLEL', 4)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(variants)))) as pool:
+            statuses = list(pool.map(lambda v: self.get_processing_status(v['task_id']), variants))
+        
+        # Canceled variants were stopped on purpose, so they are not errors
+        states = [status.get('status') for status in statuses]
+        errors = any(state in ('failed', 'error') for state in states)
+        if not all(state in TERMINAL_STATUSES for state in states):
+            overall = 'processing'
+        elif errors:
+            overall = 'completed_with_errors' if 'completed' in states else 'failed'
         else:
-            return self._real_start_processing(main_video_path, reference_video_path, template_style, instructions)
+            overall = 'completed' if 'completed' in states else 'canceled'
+        
+        return {
+            'group_id': group_id,
+            'status': overall,
+            'progress': int(sum(status.get('progress', 0) or 0 for status in statuses) / len(statuses)),
+            'completed': states.count('completed'),
+            'canceled': states.count('canceled'),
+            'total': len(statuses),
+            'variants': [
+                dict(status, task_id=variant['task_id'], template_style=variant.get('template_style'))
+                for variant, status in zip(variants, statuses)
+            ]
+        }
     
-    def _mock_start_processing(self, main_video_path, reference_video_path, template_style, instructions):
+    def _mock_start_processing(self, main_video_path, reference_video_path, template_style, instructions,
+                               prepared_inputs=None, user_id=None, priority='normal', group_id=None):
         """
         Mock processing for hackathon demo
         Simulates API calls and returns a mock task ID
         """
-        print(f"🎬 MOCK: Starting video processing")
-        print(f"   Main Video: {main_video_path}")
-        print(f"   Reference Video: {reference_video_path}")
-        print(f"   Template Style: {template_style}")
-        print(f"   Instructions: {instructions}")
+        logger.info("Mock processing started", extra={
+            'main_video': main_video_path,
+            'reference_video': reference_video_path,
+            'template_style': template_style,
+            'instructions': instructions,
+        })
         
         # Simulate API delay
         time.sleep(1)
         
-        # Generate a unique task ID
-        task_id = f"mock_task_{int(time.time())}_{hash(main_video_path) % 10000}"
+        # Generate a unique task ID (batch variants share the same video and second)
+        task_id = f"mock_task_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        
+        probe = (prepared_inputs or {}).get('probe') or {}
+        runner = get_job_runner()
         
         # Store processing details (in real app, this would be in database)
         processing_details = {
@@ -46,28 +191,142 @@ class VideoProcessor:
             'reference_video': reference_video_path,
             'template_style': template_style,
             'instructions': instructions,
-            'status': 'processing',
+            'status': 'queued',
             'progress': 0,
+            'user_id': user_id,
+            'priority': priority,
+            'group_id': group_id,
+            'owner': runner.owner_id(),
             'started_at': time.time(),
-            'estimated_completion': time.time() + 30  # 30 seconds from now
+            'estimated_completion': time.time() + MOCK_RENDER_SECONDS,
+            'probe': probe or None
         }
         
         # In a real app, you'd save this to database
         self._save_processing_details(task_id, processing_details)
         
+        # Queue the render for a local worker slot; shorter videos are cheaper to schedule
+        runner.submit(
+            task_id,
+            self._mock_render,
+            on_start=self._start_job,
+            on_finish=self._finish_job,
+            user=user_id,
+            priority=priority,
+            cost=self._cost_hint(probe),
+            estimated_seconds=MOCK_RENDER_SECONDS,
+            group=group_id
+        )
+        
         return task_id
     
-    def _real_start_processing(self, main_video_path, reference_video_path, template_style, instructions):
+    def _cost_hint(self, probe):
+        """
+        Queue cost of a render in seconds of video: the probed duration, or
+        an estimate from the file size when ffprobe could not tell
+        """
+        if probe.get('duration'):
+            return probe['duration']
+        if probe.get('size'):
+            return probe['size'] / getattr(settings, 'RENDER_COST_BYTES_PER_SECOND', 1_000_000)
+        return None
+    
+    def _mock_render(self, context):
+        """
+        Stand-in for local rendering work: occupies a worker slot for
+        MOCK_RENDER_SECONDS, waking immediately if canceled
+        """
+        self._prepare_edit_plan(context)
+        
+        deadline = time.time() + MOCK_RENDER_SECONDS
+        while time.time() < deadline:
+            context.sleep(min(0.5, max(0, deadline - time.time())))
+    
+    def _prepare_edit_plan(self, context):
+        """
+        Run the analysis stages the template needs and store the resulting
+        edit plan (e.g. the fast_cuts cut list, or the Custom template's
+        reference fingerprint) on the task for the renderer
+        """
+        details = self._get_processing_details(context.task_id)
+        if not details:
+            return None
+        
+        style_params = self._map_template_to_parameters(details.get('template_style'))
+        plan = {'style_params': style_params}
+        
+        if style_params.get('style_transfer') and details.get('reference_video'):
+            try:
+                fingerprint = fingerprint_reference(details['reference_video'], context)
+                plan['reference_fingerprint'] = fingerprint
+                style_params.update(fingerprint_to_parameters(fingerprint))
+            except (OSError, RuntimeError, subprocess.CalledProcessError, ValueError) as e:
+                logger.warning("Skipping reference fingerprint", extra={'task_id': context.task_id, 'reason': str(e)})
+                plan['reference_fingerprint'] = {'skipped': str(e)}
+        
+        if style_params.get('style') == 'fast_cuts' or style_params.get('trim_silence'):
+            try:
+                plan['audio'] = analyze_audio(details['main_video'], style_params.get('pace', 'high'), context)
+            except AudioUnavailable as e:
+                logger.warning("Skipping audio analysis", extra={'task_id': context.task_id, 'reason': str(e)})
+                plan['audio'] = {'skipped': str(e)}
+        
+        if style_params.get('style') == 'cinematic' or style_params.get('transitions') == 'smooth':
+            try:
+                plan['scenes'] = detect_scenes(details['main_video'], context)
+            except (OSError, RuntimeError, subprocess.CalledProcessError, ValueError) as e:
+                logger.warning("Skipping scene detection", extra={'task_id': context.task_id, 'reason': str(e)})
+                plan['scenes'] = {'skipped': str(e)}
+        
+        context.check()
+        # Reload: the task may have been marked canceled while the stages ran
+        details = self._get_processing_details(context.task_id)
+        if not details or details.get('status') in TERMINAL_STATUSES:
+            return plan
+        details['edit_plan'] = plan
+        self._save_processing_details(context.task_id, details)
+        return plan
+    
+    def _start_job(self, task_id):
+        """
+        Record that a queued job got a worker slot
+        """
+        details = self._get_processing_details(task_id)
+        if details and details.get('status') == 'queued':
+            details['status'] = 'processing'
+            details['processing_started_at'] = time.time()
+            details['estimated_completion'] = time.time() + MOCK_RENDER_SECONDS
+            self._save_processing_details(task_id, details)
+    
+    def _finish_job(self, task_id, outcome, error):
+        """
+        Record the final state of a local job, unless the task was already
+        settled elsewhere (e.g. marked canceled after CANCEL_TIMEOUT)
+        """
+        details = self._get_processing_details(task_id)
+        if not details or details.get('status') in TERMINAL_STATUSES:
+            return
+        details['status'] = outcome
+        details['finished_at'] = time.time()
+        if outcome == 'completed':
+            details['progress'] = 100
+            details['download_url'] = f"/media/processed/{task_id}_final.mp4"
+        if error:
+            details['error'] = error
+        self._save_processing_details(task_id, details)
+    
+    def _real_start_processing(self, main_video_path, reference_video_path, template_style, instructions,
+                               prepared_inputs=None, user_id=None, priority='normal', group_id=None):
         """
         Real implementation for actual video editing API
         This would integrate with services like RunwayML, FFmpeg, or custom AI models
         """
         try:
-            # Prepare video files for API
-            main_video_url = self._prepare_video_for_api(main_video_path)
-            reference_video_url = None
-            if reference_video_path:
-                reference_video_url = self._prepare_video_for_api(reference_video_path)
+            # Prepare video files for API (batches pass them in already prepared)
+            if prepared_inputs is None:
+                prepared_inputs = self.prepare_inputs(main_video_path, reference_video_path)
+            main_video_url = prepared_inputs['main_video_url']
+            reference_video_url = prepared_inputs['reference_video_url']
             
             # Map template styles to API parameters
             style_params = self._map_template_to_parameters(template_style)
@@ -92,15 +351,16 @@ class VideoProcessor:
                 'Content-Type': 'application/json'
             }
             
-            print(f"🚀 Sending to Video API: {self.api_base_url}/process")
+            logger.debug("Sending to Video API", extra={'url': f"{self.api_base_url}/process"})
             
             # Make API call to video editing service
-            response = requests.post(
-                f"{self.api_base_url}/process",
-                json=payload,
-                headers=headers,
-                timeout=30
-            )
+            with span('video_api.process'):
+                response = _http_session().post(
+                    f"{self.api_base_url}/process",
+                    json=payload,
+                    headers=headers,
+                    timeout=30
+                )
             
             if response.status_code == 200:
                 data = response.json()
@@ -124,13 +384,14 @@ class VideoProcessor:
                 
             else:
                 error_msg = f"Video API error: {response.status_code} - {response.text}"
-                print(f"❌ {error_msg}")
+                logger.warning(error_msg)
                 raise Exception(error_msg)
                 
         except Exception as e:
-            print(f"❌ Error in real video processing: {str(e)}")
-            # Fall back to mock mode if real API fails
-            return self._mock_start_processing(main_video_path, reference_video_path, template_style, instructions)
+            logger.warning("Error in real video processing, falling back to mock", extra={'error': str(e)})
+            # Fall back to mock mode if real API fails, keeping the caller's place in the fair-share queue
+            return self._mock_start_processing(main_video_path, reference_video_path, template_style, instructions,
+                                               prepared_inputs, user_id, priority, group_id)
     
     def get_processing_status(self, task_id):
         """
@@ -151,37 +412,76 @@ class VideoProcessor:
             if not details:
                 return {'status': 'error', 'progress': 0, 'error': 'Task not found'}
             
-            # Simulate progress
-            elapsed = time.time() - details['started_at']
-            total_estimated = 30  # 30 seconds total for mock
+            # Finished (or canceled) tasks keep their final state
+            if details.get('status') in TERMINAL_STATUSES:
+                return {
+                    'status': details['status'],
+                    'progress': details.get('progress', 0),
+                    'download_url': details.get('download_url'),
+                    'estimated_seconds_remaining': 0
+                }
             
-            if elapsed >= total_estimated:
-                progress = 100
-                status = 'completed'
-                download_url = f"/media/processed/{task_id}_final.mp4"
-            else:
-                progress = min(95, int((elapsed / total_estimated) * 100))
-                status = 'processing'
-                download_url = None
+            # Jobs only make progress in the process that queued them
+            if details.get('owner') and not owner_alive(details['owner']):
+                return self._fail_orphaned(task_id)
             
-            # Update details
-            details['progress'] = progress
-            details['status'] = status
-            if download_url:
-                details['download_url'] = download_url
+            # A cancel is pending until the job notices it
+            if default_storage.exists(cancel_marker_path(task_id)):
+                return {
+                    'status': 'canceling',
+                    'progress': details.get('progress', 0),
+                    'download_url': None,
+                    'estimated_seconds_remaining': 0
+                }
             
-            self._save_processing_details(task_id, details)
+            if details.get('status') == 'queued':
+                position = queue_position(task_id) or {}
+                wait = max(0, position.get('expected_start_at', time.time()) - time.time())
+                return {
+                    'status': 'queued',
+                    'progress': 0,
+                    'download_url': None,
+                    'queue_position': position.get('queue_position'),
+                    'expected_start_at': position.get('expected_start_at'),
+                    'expected_start_in': wait,
+                    'estimated_seconds_remaining': wait + MOCK_RENDER_SECONDS
+                }
+            
+            # Simulate progress from when the job got its worker slot
+            elapsed = time.time() - details.get('processing_started_at', details['started_at'])
+            total_estimated = MOCK_RENDER_SECONDS
             
             return {
-                'status': status,
-                'progress': progress,
-                'download_url': download_url,
+                'status': 'processing',
+                'progress': min(95, int((elapsed / total_estimated) * 100)),
+                'download_url': None,
                 'estimated_seconds_remaining': max(0, total_estimated - elapsed)
             }
             
         except Exception as e:
             return {'status': 'error', 'progress': 0, 'error': str(e)}
     
+    def _fail_orphaned(self, task_id):
+        """
+        Mark a task failed whose owning process exited (worker restart,
+        instance sleep) before finishing it
+        """
+        details = self._get_processing_details(task_id)
+        if details and details.get('status') not in TERMINAL_STATUSES:
+            logger.warning("Render job lost with its worker", extra={'task_id': task_id, 'owner': details.get('owner')})
+            details['status'] = 'failed'
+            details['error'] = 'The render worker stopped before the job finished; please start it again'
+            details['finished_at'] = time.time()
+            self._save_processing_details(task_id, details)
+            clear_cancel_request(task_id)
+        return {
+            'status': (details or {}).get('status', 'failed'),
+            'progress': (details or {}).get('progress', 0),
+            'download_url': (details or {}).get('download_url'),
+            'error': (details or {}).get('error'),
+            'estimated_seconds_remaining': 0
+        }
+    
     def _real_get_status(self, task_id):
         """
         Real implementation for checking status with actual API
@@ -189,11 +489,12 @@ class VideoProcessor:
         try:
             headers = {'Authorization': f'Bearer {self.api_key}'}
             
-            response = requests.get(
-                f"{self.api_base_url}/status/{task_id}",
-                headers=headers,
-                timeout=10
-            )
+            with span('video_api.status'):
+                response = _http_session().get(
+                    f"{self.api_base_url}/status/{task_id}",
+                    headers=headers,
+                    timeout=10
+                )
             
             if response.status_code == 200:
                 api_data = response.json()
@@ -223,10 +524,11 @@ class VideoProcessor:
         else:
             try:
                 headers = {'Authorization': f'Bearer {self.api_key}'}
-                response = requests.get(
-                    f"{self.api_base_url}/download/{task_id}",
-                    headers=headers
-                )
+                with span('video_api.download'):
+                    response = _http_session().get(
+                        f"{self.api_base_url}/download/{task_id}",
+                        headers=headers
+                    )
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -235,7 +537,7 @@ class VideoProcessor:
                     return None
                     
             except Exception as e:
-                print(f"Error getting download URL: {e}")
+                logger.warning("Error getting download URL", extra={'task_id': task_id, 'error': str(e)})
                 return None
     
     def _prepare_video_for_api(self, file_path):
@@ -270,7 +572,7 @@ class VideoProcessor:
             # For hackathon demo, return a mock URL
             return f"https://your-storage.com/videos/{os.path.basename(file_path)}"
         except Exception as e:
-            print(f"Cloud storage upload error: {e}")
+            logger.warning("Cloud storage upload error", extra={'error': str(e)})
             return f"file://{file_path}"  # Fallback
     
     def _map_template_to_parameters(self, template_style):
@@ -314,50 +616,105 @@ class VideoProcessor:
         Save processing details to temporary storage
         In production, use database. For hackathon, using file storage.
         """
-        try:
-            storage_path = f"processing_tasks/{task_id}.json"
-            with default_storage.open(storage_path, 'w') as f:
-                json.dump(details, f)
-        except Exception as e:
-            print(f"Error saving processing details: {e}")
+        self._save_record(f"processing_tasks/{task_id}.json", details)
     
     def _get_processing_details(self, task_id):
         """
         Retrieve processing details from storage
         """
+        return self._load_record(f"processing_tasks/{task_id}.json")
+    
+    def _save_record(self, storage_path, data):
+        """
+        Write a JSON record (task or batch group) to storage
+        """
+        try:
+            with span('task_store.write'):
+                write_json(storage_path, data)
+        except Exception as e:
+            logger.error("Error saving record", extra={'path': storage_path, 'error': str(e)})
+    
+    def _load_record(self, storage_path):
+        """
+        Read a JSON record from storage, or None if it does not exist
+        """
         try:
-            storage_path = f"processing_tasks/{task_id}.json"
-            if default_storage.exists(storage_path):
-                with default_storage.open(storage_path, 'r') as f:
-                    return json.load(f)
+            with span('task_store.read'):
+                if default_storage.exists(storage_path):
+                    with default_storage.open(storage_path, 'r') as f:
+                        return json.load(f)
         except Exception as e:
-            print(f"Error loading processing details: {e}")
+            logger.error("Error loading record", extra={'path': storage_path, 'error': str(e)})
         
         return None
     
     def cancel_processing(self, task_id):
         """
         Cancel ongoing video processing
+        Local jobs are stopped (subprocesses killed, worker slot freed)
+        within CANCEL_TIMEOUT seconds, wherever they are running
         """
+        details = self._get_processing_details(task_id)
+        if not details:
+            return False
+        if details.get('status') in TERMINAL_STATUSES:
+            return details['status'] == 'canceled'
+        
         if not self.mock_mode:
             try:
                 headers = {'Authorization': f'Bearer {self.api_key}'}
-                response = requests.post(
-                    f"{self.api_base_url}/cancel/{task_id}",
-                    headers=headers
-                )
-                return response.status_code == 200
+                with span('video_api.cancel'):
+                    response = _http_session().post(
+                        f"{self.api_base_url}/cancel/{task_id}",
+                        headers=headers
+                    )
+                if response.status_code != 200:
+                    return False
             except Exception as e:
-                print(f"Error canceling task: {e}")
+                # Upstream never confirmed the cancel, so the task may still be rendering
+                logger.warning("Error canceling task", extra={'task_id': task_id, 'error': str(e)})
+                return False
+
+            # Rendering happens upstream, so there is no local job to stop
+            if not get_job_runner().is_running(task_id):
+                details['status'] = 'canceled'
+                details['finished_at'] = time.time()
+                self._save_processing_details(task_id, details)
+                return True
         
-        # For mock mode or if real cancel fails, just mark as canceled
-        details = self._get_processing_details(task_id)
-        if details:
-            details['status'] = 'canceled'
-            self._save_processing_details(task_id, details)
-            return True
+        # A job owned by this process has its subprocesses killed right away;
+        # one running in another worker is asked through a cancel marker
+        if not get_job_runner().cancel(task_id):
+            request_cancel(task_id)
+        
+        # Wait for the job thread to unwind and record the cancel
+        deadline = time.time() + getattr(settings, 'CANCEL_TIMEOUT', 5.0)
+        while time.time() < deadline:
+            details = self._get_processing_details(task_id) or details
+            if details.get('status') in TERMINAL_STATUSES:
+                return details['status'] == 'canceled'
+            time.sleep(0.05)
+        
+        # Nobody owns the job (e.g. its worker restarted): mark it canceled ourselves
+        clear_cancel_request(task_id)
+        details['status'] = 'canceled'
+        details['finished_at'] = time.time()
+        self._save_processing_details(task_id, details)
+        return True
+    
+    def cancel_batch(self, group_id):
+        """
+        Cancel every unfinished variant of a batch
+        Returns the task IDs that were canceled
+        """
+        group = self._load_record(f"processing_groups/{group_id}.json")
+        if not group:
+            return []
         
-        return False
+        task_ids = [variant['task_id'] for variant in group['variants']]
+        with ThreadPoolExecutor(max_workers=max(1, len(task_ids))) as pool:
+            results = list(pool.map(self.cancel_processing, task_ids))
+        return [task_id for task_id, canceled in zip(task_ids, results) if canceled]
 
 # Utility function to create video processor instance
 def get_video_processor():
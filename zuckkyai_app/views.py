@@ -1,12 +1,13 @@
 import json
 import os
+import time
+from django.conf import settings
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-from .utils.gemini_client import GeminiClient
-from .utils.video_processor import VideoProcessor
+from .utils import metrics
 
 def home(request):
     """Serve the main editor interface"""
@@ -25,8 +26,9 @@ def chat_message(request):
             user_message = data.get('message', '')
             conversation_history = data.get('history', [])
             
-            # Initialize Gemini client
-            gemini = GeminiClient()
+            # Gemini client is created (and google.generativeai imported) on first chat
+            from .utils.gemini_client import get_gemini_client
+            gemini = get_gemini_client()
             
             # Get AI response
             ai_response = gemini.get_chat_response(user_message, conversation_history)
@@ -55,7 +57,13 @@ def upload_video(request):
             
             # Save the file
             file_path = f"uploads/{upload_type}/{video_file.name}"
-            saved_path = default_storage.save(file_path, ContentFile(video_file.read()))
+            started = time.perf_counter()
+            with metrics.span('upload.save'):
+                saved_path = default_storage.save(file_path, ContentFile(video_file.read()))
+            elapsed = time.perf_counter() - started
+            metrics.upload_bytes.inc(video_file.size, type=upload_type)
+            if elapsed > 0:
+                metrics.upload_throughput.observe(video_file.size / elapsed, type=upload_type)
             
             return JsonResponse({
                 'success': True,
@@ -168,6 +176,154 @@ def check_processing_status(request, task_id):
             'error': str(e)
         })
 
+@csrf_exempt
+def process_batch(request):
+    """Render one stored upload in several styles at once"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Only POST requests allowed'})
+    
+    try:
+        data = json.loads(request.body)
+        main_video_path = data.get('main_video')
+        reference_video_path = data.get('reference_video')
+        
+        # Either explicit variants, or a list of styles sharing one set of instructions
+        styles = data.get('styles', [])
+        if not isinstance(styles, list):
+            return JsonResponse({'success': False, 'error': 'styles must be a list of template names'})
+        variants = data.get('variants') or [
+            {'template_style': style, 'instructions': data.get('instructions', '')}
+            for style in styles
+        ]
+        
+        if not main_video_path or not default_storage.exists(main_video_path):
+            return JsonResponse({'success': False, 'error': 'main_video must be a file_path returned by /api/upload/'})
+        if reference_video_path and not default_storage.exists(reference_video_path):
+            return JsonResponse({'success': False, 'error': 'reference_video not found'})
+        from .utils.video_processor import get_video_processor
+        processor = get_video_processor()
+        try:
+            processor.validate_variants(variants)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)})
+        
+        if not variants:
+            return JsonResponse({'success': False, 'error': 'Provide at least one style or variant'})
+        
+        max_variants = getattr(settings, 'BATCH_MAX_VARIANTS', 8)
+        if len(variants) > max_variants:
+            return JsonResponse({'success': False, 'error': f'At most {max_variants} variants per batch'})
+        
+        priority = data.get('priority', getattr(settings, 'RENDER_DEFAULT_PRIORITY', 'normal'))
+        if not isinstance(priority, str) or priority not in getattr(settings, 'RENDER_PRIORITIES', {'normal': 1}):
+            return JsonResponse({'success': False, 'error': f'Unknown priority: {priority}'})
+        if not can_use_priority(request, priority):
+            return JsonResponse({'success': False, 'error': f"Priority '{priority}' is reserved for staff"})
+        
+        group_id = processor.start_batch(
+            main_video_path,
+            reference_video_path,
+            variants,
+            user_id=get_client_id(request),
+            priority=priority
+        )
+        
+        return JsonResponse({
+            'success': True,
+            'group_id': group_id,
+            'variant_count': len(variants),
+            'message': f'Started {len(variants)} renders'
+        })
+        
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        })
+
+@csrf_exempt
+def check_batch_status(request, group_id):
+    """Check the aggregated status of a batch render"""
+    try:
+        from .utils.video_processor import get_video_processor
+        processor = get_video_processor()
+        
+        return JsonResponse({
+            'success': True,
+            'status': processor.get_batch_status(group_id)
+        })
+        
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        })
+
+@csrf_exempt
+def cancel_processing(request, task_id):
+    """Cancel a render (or every variant of a batch) and free its worker slot"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Only POST requests allowed'})
+    
+    try:
+        from .utils.video_processor import get_video_processor
+        processor = get_video_processor()
+        
+        if task_id.startswith('group_'):
+            canceled = processor.cancel_batch(task_id)
+            return JsonResponse({
+                'success': bool(canceled),
+                'canceled': canceled
+            })
+        
+        canceled = processor.cancel_processing(task_id)
+        return JsonResponse({
+            'success': canceled,
+            'status': processor.get_processing_status(task_id)
+        })
+        
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        })
+
+def warmup(request):
+    """Prime templates, URLs and the Gemini client; safe to hit from health checks"""
+    from .warmup import warm_up
+    timings = warm_up()
+    return JsonResponse({
+        'success': True,
+        'timings_ms': {step: round(ms, 1) for step, ms in timings.items()}
+    })
+
+def metrics_view(request):
+    """Expose Prometheus metrics aggregated across workers"""
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def get_client_id(request):
+    """
+    Identify who a render belongs to, for per-user fair-share scheduling.
+    X-Forwarded-For is client-controlled except for the entries our own
+    proxies append, so only the TRUSTED_PROXY_HOPS-th entry from the right
+    is used; with no trusted proxies it is ignored in favor of REMOTE_ADDR.
+    """
+    if getattr(request, 'user', None) is not None and request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    hops = getattr(settings, 'TRUSTED_PROXY_HOPS', 0)
+    forwarded = [entry.strip() for entry in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if entry.strip()]
+    if hops and len(forwarded) >= hops:
+        return f"ip:{forwarded[-hops]}"
+    return f"ip:{request.META.get('REMOTE_ADDR', 'unknown')}"
+
+def can_use_priority(request, priority):
+    """Anyone may lower their own priority; raising it above the default is for staff"""
+    priorities = getattr(settings, 'RENDER_PRIORITIES', {'normal': 1})
+    if priorities[priority] >= priorities.get(getattr(settings, 'RENDER_DEFAULT_PRIORITY', 'normal'), 0):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
 def determine_conversation_state(user_message, ai_response):
     """Determine the current state of conversation for frontend logic"""
     message_lower = user_message.lower()
@@ -0,0 +1,71 @@
+"""
+Warm-up for cold starts: loads URLconf and views, compiles templates and
+primes the Gemini client ahead of the first real request.
+
+Called from gunicorn.conf.py (the cheap steps in the master after preload,
+the Gemini import and client in a background thread of each worker once it
+is serving) and from the /api/warmup/ endpoint.
+"""
+import logging
+import shutil
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+WARM_TEMPLATES = ('editor.html', 'base.html')
+
+
+def warm_up(prime_client=True):
+    """
+    Run each warm-up step and return their durations in milliseconds.
+    `prime_client=False` skips the Gemini SDK import (~1 s) and client,
+    leaving only the steps cheap enough for the startup critical path.
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    timings['urls'] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    from django.template.loader import get_template
+    for name in WARM_TEMPLATES:
+        get_template(name)
+    timings['templates'] = (time.perf_counter() - started) * 1000
+
+    missing = [tool for tool in ('ffmpeg', 'ffprobe') if not shutil.which(tool)]
+    if missing:
+        logger.warning("Media tools not found; probing and audio, scene and fingerprint analysis will be skipped",
+                       extra={'missing': missing})
+
+    if prime_client:
+        started = time.perf_counter()
+        import google.generativeai  # noqa: F401
+        timings['gemini_import'] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        from .utils.gemini_client import get_gemini_client
+        get_gemini_client()
+        timings['gemini_client'] = (time.perf_counter() - started) * 1000
+
+    logger.info("Warm-up complete", extra={'timings_ms': {k: round(v, 1) for k, v in timings.items()}})
+    return timings
+
+
+def warm_up_in_background():
+    """
+    Prime the Gemini client on a daemon thread so the worker can start
+    serving right away. A chat request arriving first waits for the client
+    being created (see get_gemini_client) instead of creating another.
+    """
+    def run():
+        try:
+            warm_up(prime_client=True)
+        except Exception:
+            logger.exception("Background warm-up failed")
+
+    thread = threading.Thread(target=run, daemon=True, name='warm-up')
+    thread.start()
+    return thread